@@ -1,19 +1,306 @@
+import asyncio
 import sys
+import threading
+from argparse import ArgumentParser, Namespace
+from contextlib import contextmanager
+from functools import partial
+from logging import FileHandler, Formatter, getLogger
+from typing import Any, Callable, Iterable, Iterator, List, Optional
 
+from orderbook.binary import BinaryOrderReader
 from orderbook.book import OrderBook
-from orderbook.inputparser import InputLexer
+from orderbook.encoders import (
+    COMPRESSORS,
+    ENCODERS,
+    BookEncoder,
+    DeltaEncoder,
+    TextEncoder,
+    open_output,
+)
+from orderbook.events import background_logging
+from orderbook.gateway import serve
+from orderbook.inputparser import BulkInputLexer, InputLexer, MappedInputLexer
+from orderbook.journal import Journal, recover
+from orderbook.order import Order
+from orderbook.registry import BookRegistry
+from orderbook.sharding import ShardedMatcher
+from orderbook.transaction import Transaction
 
 
-def start():
-    lexer = InputLexer(sys.stdin)
-    book = OrderBook()
+def parse_args(args: Optional[List[str]] = None) -> Namespace:
+    """
+    Unknown arguments are ignored, so the application may be started with
+    arbitrary arguments as before.
+    """
+    parser = ArgumentParser(prog="orderbook", allow_abbrev=False)
+    parser.add_argument(
+        "--input", metavar="PATH", help="read orders from a memory-mapped file"
+    )
+    parser.add_argument(
+        "--bulk", action="store_true", help="read stdin in blocks instead of lines"
+    )
+    parser.add_argument(
+        "--binary", action="store_true", help="read orders in the binary format"
+    )
+    parser.add_argument(
+        "--format",
+        choices=ENCODERS,
+        default="text",
+        help="output format, all but text write the trade tape only",
+    )
+    parser.add_argument("--compress", choices=COMPRESSORS, help="compress the output")
+    parser.add_argument("--output", metavar="PATH", help="write to a file, not stdout")
+    parser.add_argument(
+        "--top",
+        metavar="N",
+        type=int,
+        help="show only the best N records of every side of the book",
+    )
+    parser.add_argument(
+        "--snapshot-every",
+        metavar="N",
+        type=int,
+        default=0,
+        help="write the whole book every N orders in the deltas format",
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=4096,
+        help="transactions per write of the trade tape",
+    )
+    parser.add_argument(
+        "--symbols",
+        action="store_true",
+        help="match SYMBOL,order lines of many instruments, writes the trade tape",
+    )
+    parser.add_argument(
+        "--workers",
+        metavar="N",
+        type=int,
+        help="worker processes of --symbols, one per CPU by default",
+    )
+    parser.add_argument(
+        "--evict-after",
+        metavar="SECONDS",
+        type=float,
+        help="move books of --symbols idle for longer to disk",
+    )
+    parser.add_argument(
+        "--memory-limit",
+        metavar="MB",
+        type=float,
+        help="move least recently used books of --symbols to disk above the limit",
+    )
+    parser.add_argument(
+        "--evict-dir", metavar="PATH", help="directory of books moved to disk"
+    )
+    parser.add_argument(
+        "--journal",
+        metavar="PATH",
+        help="recover the book from the journal and write accepted orders to it",
+    )
+    parser.add_argument(
+        "--checkpoint",
+        metavar="PATH",
+        help="snapshot of --journal to recover from, written and the journal "
+        "emptied at exit",
+    )
+    parser.add_argument(
+        "--port", type=int, help="serve the book on a TCP port instead of stdin"
+    )
+    parser.add_argument("--host", default="127.0.0.1", help="address of --port")
+    parser.add_argument(
+        "--unix",
+        metavar="PATH",
+        help="serve the book on a Unix socket instead of stdin",
+    )
+    parser.add_argument(
+        "--log", metavar="PATH", help="write events to a file from a background thread"
+    )
+    parser.add_argument(
+        "--log-level",
+        type=str.upper,
+        choices=["DEBUG", "INFO", "WARNING", "ERROR"],
+        default="INFO",
+        help="level of the --log file",
+    )
+    return parser.parse_known_args(args)[0]
 
-    while True:
-        order = lexer.get()
-        if order is None:
-            break
 
-        for transaction in book.add(order):
-            sys.stdout.write(str(transaction) + "\n")
+@contextmanager
+def open_lexer(options: Namespace) -> Iterator[Iterable[Order]]:
+    """
+    Lexer of the input, which is closed on exit if it is a file.
+    """
+    if options.binary:
+        if options.input is None:
+            yield BinaryOrderReader(sys.stdin.buffer)
+            return
+        with open(options.input, "rb") as file:
+            yield BinaryOrderReader(file)
+        return
 
-        sys.stdout.write(str(book) + "\n")
+    if options.input is not None:
+        yield MappedInputLexer(options.input)
+    elif options.bulk:
+        yield BulkInputLexer(sys.stdin)
+    else:
+        yield InputLexer(sys.stdin)
+
+
+@contextmanager
+def log_to(path: Optional[str], level: str) -> Iterator[None]:
+    """
+    Write logs to the file from a background thread, so matching never
+    waits for the file.
+    """
+    if path is None:
+        yield
+        return
+
+    handler = FileHandler(path)
+    handler.setFormatter(Formatter("%(asctime)s %(levelname)s %(message)s"))
+    try:
+        with background_logging(getLogger(), handler, level=level):
+            yield
+    finally:
+        handler.close()
+
+
+@contextmanager
+def open_book(options: Namespace) -> Iterator[OrderBook]:
+    """
+    Recover the book from --checkpoint and --journal and write its accepted
+    orders to the journal. The checkpoint is written however the book is
+    left, e.g. when a server is interrupted.
+    """
+    if options.journal is None:
+        yield OrderBook()
+        return
+
+    book = recover(options.checkpoint, options.journal)
+    with Journal(options.journal) as journal:
+        book.journal = journal
+        try:
+            yield book
+        finally:
+            if options.checkpoint is not None:
+                journal.checkpoint(book, options.checkpoint)
+
+
+@contextmanager
+def durable_output(
+    write: Callable[[Any], Any], journal: Optional[Journal]
+) -> Iterator[Callable[[Any], None]]:
+    """
+    Hold back output until the journal entries of the orders before it are
+    on disk. Held output is written when the journal syncs a group, and the
+    rest after the last group is synced on exit. While the input is idle, a
+    background thread syncs the journal every `max_delay` seconds and writes
+    what was held, so the output of an order never waits for the next one.
+    """
+    if journal is None:
+        yield write
+        return
+
+    held: List[Any] = []
+    lock = threading.Lock()
+    stopped = threading.Event()
+
+    def release() -> None:
+        for data in held:
+            write(data)
+        held.clear()
+
+    def hold(data: Any) -> None:
+        with lock:
+            held.append(data)
+            if not journal.pending:  # type: ignore
+                release()
+
+    def sync_idle() -> None:
+        while not stopped.wait(journal.max_delay):  # type: ignore
+            with lock:
+                if journal.pending:  # type: ignore
+                    journal.sync()  # type: ignore
+                    release()
+
+    syncer = threading.Thread(target=sync_idle, name="journal-sync", daemon=True)
+    syncer.start()
+    try:
+        yield hold
+    finally:
+        stopped.set()
+        syncer.join()
+    journal.sync()
+    release()
+
+
+def start(args: Optional[List[str]] = None):
+    options = parse_args(args)
+    if options.port is not None or options.unix is not None:
+        with log_to(options.log, options.log_level), open_book(options) as book:
+            asyncio.run(serve(book, options.host, options.port, options.unix))
+        return
+
+    if options.symbols:
+        start_sharded(options)
+        return
+
+    encoder = ENCODERS[options.format]()
+    if isinstance(encoder, DeltaEncoder):
+        encoder.snapshot_every = options.snapshot_every
+    elif isinstance(encoder, TextEncoder):
+        encoder.top_n = options.top
+
+    with log_to(options.log, options.log_level), open_lexer(
+        options
+    ) as lexer, open_book(options) as book, open_output(
+        options.output, encoder.binary, options.compress
+    ) as output, durable_output(
+        output.write, book.journal
+    ) as write:
+        if encoder.header:
+            output.write(encoder.header)
+        if isinstance(encoder, DeltaEncoder) and (any(book.buy) or any(book.sell)):
+            # Deltas apply to the records of a recovered book, so they go first
+            output.write(encoder.snapshot(book))
+
+        if isinstance(encoder, BookEncoder):
+            for order in lexer:
+                write(encoder.order(order, book.add(order), book))
+            return
+
+        batch: List[Transaction] = []
+        for order in lexer:
+            batch += book.add(order)
+            if len(batch) >= options.batch_size:
+                write(encoder.transactions(batch))
+                batch.clear()
+        if batch:
+            write(encoder.transactions(batch))
+
+
+def start_sharded(options: Namespace) -> None:
+    if options.input is not None:
+        lexer: BulkInputLexer = MappedInputLexer(options.input)
+    else:
+        lexer = BulkInputLexer(sys.stdin)
+    memory_limit = None
+    if options.memory_limit is not None:
+        memory_limit = int(options.memory_limit * 2 ** 20)
+    registry_factory = partial(
+        BookRegistry,
+        options.evict_dir,
+        max_idle=options.evict_after,
+        memory_limit=memory_limit,
+    )
+
+    with log_to(options.log, options.log_level), open_output(
+        options.output, False, options.compress
+    ) as output, ShardedMatcher(
+        options.workers, options.batch_size, registry_factory
+    ) as matcher:
+        for chunk in matcher.run(lexer):
+            output.write(chunk)
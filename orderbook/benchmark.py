@@ -0,0 +1,317 @@
+"""
+Benchmarks of the matching engines, the lexer and the renderer.
+
+Every scenario times its operations one by one with perf_counter_ns and
+reports throughput and latency percentiles. Work which prepares an
+operation, like building the order or refilling the book, is done between
+the timed calls. Results are written as JSON and compared with a previous
+run by
+
+    python -m orderbook.benchmark --output new.json --compare old.json
+"""
+import gc
+import json
+import math
+import platform
+import random
+import sys
+from argparse import ArgumentParser
+from functools import partial
+from io import StringIO
+from time import perf_counter_ns
+from typing import Callable, Dict, Iterator, List, Optional, Type
+
+from orderbook.book import OrderBook
+from orderbook.columnar import ColumnarOrderBook
+from orderbook.inputparser import InputLexer
+from orderbook.ladder import LadderOrderBook
+from orderbook.order import Order
+from orderbook.pricearray import ArrayOrderBook
+
+VERSION = 1
+ENGINES: Dict[str, Type[OrderBook]] = {
+    "book": OrderBook,
+    "ladder": LadderOrderBook,
+    "array": ArrayOrderBook,
+    "columnar": ColumnarOrderBook,
+}
+# Keys of latency percentiles in the results, in microseconds
+PERCENTILES = {"p50_us": 0.5, "p99_us": 0.99, "p99.9_us": 0.999}
+
+Operations = Iterator[Callable[[], object]]
+
+
+class Scenario:
+    """
+    Operations of a scenario for a book type, `size` operations and a book
+    prefilled with `depth` records where the scenario needs a deep book.
+    """
+
+    engine: Type[OrderBook]
+    size: int
+    depth: int
+
+    def __init__(
+        self, engine: Type[OrderBook], size: int, depth: int, rnd: random.Random
+    ):
+        self.engine = engine
+        self.size = max(size, 1)
+        self.depth = depth
+        self.rnd = rnd
+        self.__order_id = 0
+
+    def order(
+        self, is_buy: bool, price: int, quantity: int, peak_size: Optional[int] = None
+    ) -> Order:
+        self.__order_id += 1
+        return Order(is_buy, self.__order_id, price, quantity, peak_size)
+
+    def prefill(self, book: OrderBook, count: int, spread: int = 10) -> None:
+        """
+        Rest records on both sides, buys below 1000 - spread and sells above
+        1000 + spread, so they are never reached by orders near 1000.
+        """
+        rnd = self.rnd
+        for index in range(count):
+            offset = spread + rnd.randint(1, 100)
+            quantity = rnd.randint(1, 100)
+            if index % 2:
+                book.add(self.order(True, 1000 - offset, quantity))
+            else:
+                book.add(self.order(False, 1000 + offset, quantity))
+
+
+def add_passive(scenario: Scenario) -> Operations:
+    """
+    Orders which don't cross the spread and rest in the book.
+    """
+    book, rnd = scenario.engine(), scenario.rnd
+    for index in range(scenario.size):
+        is_buy = bool(index % 2)
+        offset = rnd.randint(0, 99)
+        price = 999 - offset if is_buy else 1001 + offset
+        order = scenario.order(is_buy, price, rnd.randint(1, 100))
+        yield partial(book.add, order)
+
+
+def add_aggressive(scenario: Scenario) -> Operations:
+    """
+    Orders which sweep five price levels of the other side. The swept
+    records are put back before every order, so the depth stays the same.
+    """
+    book = scenario.engine()
+    scenario.prefill(book, scenario.depth)
+    for index in range(scenario.size):
+        is_buy = bool(index % 2)
+        for level in range(1, 6):
+            price = 1000 + level if is_buy else 1000 - level
+            book.add(scenario.order(not is_buy, price, 20))
+        order = scenario.order(is_buy, 1005 if is_buy else 995, 100)
+        yield partial(book.add, order)
+
+
+def add_iceberg(scenario: Scenario) -> Operations:
+    """
+    Orders which fill five icebergs of one level completely, reloading their
+    peaks many times.
+    """
+    book = scenario.engine()
+    scenario.prefill(book, scenario.depth)
+    for index in range(scenario.size):
+        is_buy = bool(index % 2)
+        for _ in range(5):
+            book.add(scenario.order(not is_buy, 1000, 100, 10))
+        yield partial(book.add, scenario.order(is_buy, 1000, 500))
+
+
+def add_deep(scenario: Scenario) -> Operations:
+    """
+    Mixed passive and aggressive orders near the top of a deep book.
+    """
+    book, rnd = scenario.engine(), scenario.rnd
+    scenario.prefill(book, scenario.depth, spread=0)
+    for index in range(scenario.size):
+        is_buy = bool(index % 2)
+        price = 1000 + rnd.randint(-5, 5)
+        order = scenario.order(is_buy, price, rnd.randint(1, 100))
+        yield partial(book.add, order)
+
+
+def lexer_get(scenario: Scenario) -> Operations:
+    """
+    InputLexer.get of order lines mixed with comments and empty lines.
+    """
+    rnd = scenario.rnd
+    lines = []
+    for order_id in range(1, scenario.size + 1):
+        if rnd.random() < 0.1:
+            lines.append(rnd.choice(["\n", "  # comment\n"]))
+        peak = f",{rnd.randint(1, 10)}" if rnd.random() < 0.3 else ""
+        lines.append(
+            f"{rnd.choice('BS')},{order_id},{rnd.randint(1, 32767)},"
+            f"{rnd.randint(10, 10000)}{peak}\n"
+        )
+    lexer = InputLexer(StringIO("".join(lines)))
+    for _ in range(scenario.size):
+        yield lexer.get
+
+
+def from_string(scenario: Scenario) -> Operations:
+    rnd = scenario.rnd
+    for order_id in range(1, scenario.size + 1):
+        peak = f",{rnd.randint(1, 10)}" if rnd.random() < 0.3 else ""
+        line = (
+            f"{rnd.choice('BS')},{order_id},{rnd.randint(1, 32767)},"
+            f"{rnd.randint(10, 10000)}{peak}\n"
+        )
+        yield partial(Order.from_string, line)
+
+
+def render(scenario: Scenario) -> Operations:
+    """
+    str of a book of 100 records per side, with the best sell record
+    partially filled before every call.
+    """
+    book = scenario.engine()
+    for level in range(1, 101):
+        book.add(scenario.order(True, 1000 - level, 10 ** 6))
+        book.add(scenario.order(False, 1000 + level, 10 ** 6))
+    for _ in range(scenario.size):
+        book.add(scenario.order(True, 1001, 1))
+        yield partial(str, book)
+
+
+SCENARIOS: Dict[str, Callable[[Scenario], Operations]] = {
+    "add_passive": add_passive,
+    "add_aggressive": add_aggressive,
+    "add_iceberg": add_iceberg,
+    "add_deep": add_deep,
+    "lexer_get": lexer_get,
+    "from_string": from_string,
+    "render": render,
+}
+
+
+def percentile(samples: List[int], fraction: float) -> int:
+    """
+    :param samples: Sorted samples
+    :return: Nearest-rank percentile
+    """
+    rank = max(math.ceil(fraction * len(samples)), 1)
+    return samples[rank - 1]
+
+
+def measure(operations: Operations) -> Dict[str, float]:
+    """
+    :return: Number of operations, operations per second of the timed calls
+        and latency percentiles in microseconds
+    """
+    samples = []
+    gc.collect()
+    for operation in operations:
+        start = perf_counter_ns()
+        operation()
+        samples.append(perf_counter_ns() - start)
+    samples.sort()
+
+    result = {
+        "operations": len(samples),
+        "throughput": len(samples) * 1e9 / max(sum(samples), 1),
+    }
+    for key, fraction in PERCENTILES.items():
+        result[key] = percentile(samples, fraction) / 1000
+    return result
+
+
+def run(
+    names: List[str],
+    engine: str = "book",
+    size: int = 10000,
+    depth: int = 10000,
+    seed: int = 0,
+) -> Dict:
+    """
+    :return: Machine-readable results of the scenarios
+    """
+    results = dict()
+    for name in names:
+        scenario = Scenario(ENGINES[engine], size, depth, random.Random(seed))
+        results[name] = measure(SCENARIOS[name](scenario))
+    return {
+        "version": VERSION,
+        "python": platform.python_version(),
+        "engine": engine,
+        "size": size,
+        "depth": depth,
+        "seed": seed,
+        "results": results,
+    }
+
+
+def report(results: Dict, previous: Optional[Dict] = None) -> str:
+    """
+    :param previous: Results of an earlier run to compare with
+    :return: Table of the results, with the change of every value in percent
+        if there are previous results
+    """
+    columns = ["throughput", *PERCENTILES]
+    lines = [
+        f"{'scenario':16}{'ops/s':>12}"
+        + "".join(f"{key.replace('_', ' '):>12}" for key in PERCENTILES)
+    ]
+    for name, result in results["results"].items():
+        line = f"{name:16}" + "".join(f"{result[key]:12,.1f}" for key in columns)
+        if previous is not None and name in previous["results"]:
+            old = previous["results"][name]
+            line += "  " + " ".join(
+                f"{(result[key] / old[key] - 1) * 100:+.1f}%" if old[key] else "n/a"
+                for key in columns
+            )
+        lines.append(line)
+    return "\n".join(lines)
+
+
+def main(args: Optional[List[str]] = None) -> None:
+    parser = ArgumentParser(
+        prog="python -m orderbook.benchmark",
+        description="Measure throughput and latency of the order book",
+    )
+    parser.add_argument(
+        "--scenario",
+        action="append",
+        choices=SCENARIOS,
+        help="run only this scenario, may be repeated",
+    )
+    parser.add_argument("--engine", choices=ENGINES, default="book")
+    parser.add_argument(
+        "--size", type=int, default=10000, help="operations per scenario"
+    )
+    parser.add_argument(
+        "--depth", type=int, default=10000, help="records of prefilled books"
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", metavar="PATH", help="write results as JSON")
+    parser.add_argument(
+        "--compare", metavar="PATH", help="results of an earlier run to compare with"
+    )
+    options = parser.parse_args(args)
+
+    results = run(
+        options.scenario or list(SCENARIOS),
+        options.engine,
+        options.size,
+        options.depth,
+        options.seed,
+    )
+    previous = None
+    if options.compare is not None:
+        with open(options.compare) as file:
+            previous = json.load(file)
+    sys.stdout.write(report(results, previous) + "\n")
+    if options.output is not None:
+        with open(options.output, "w") as file:
+            json.dump(results, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+"""
+Fixed-width binary order format.
+
+Every order is a 15 byte little-endian record: direction byte b"B" or b"S",
+uint32 id, uint16 price, uint32 quantity and uint32 peak size, where 0 means
+no peak size. Text order files are converted with
+
+    python -m orderbook.binary orders.txt orders.bin
+"""
+import logging
+import struct
+import sys
+from argparse import ArgumentParser
+from contextlib import ExitStack
+from itertools import islice
+from logging import INFO
+from typing import IO, BinaryIO, Iterable, Iterator, List, Optional, Tuple
+
+from orderbook.inputparser import BulkInputLexer
+from orderbook.order import MAX_ORDER_ID, MAX_PRICE, MAX_QUANTITY, Order
+
+RECORD = struct.Struct("<cIHII")
+NO_PEAK = 0
+
+Record = Tuple[bytes, int, int, int, int]
+
+
+def encode(order: Order) -> bytes:
+    peak_size = NO_PEAK if order.peak_size is None else order.peak_size
+    return RECORD.pack(
+        b"B" if order.is_buy else b"S",
+        order.order_id,
+        order.price,
+        order.quantity,
+        peak_size,
+    )
+
+
+def convert(
+    input_stream, output: BinaryIO, batch_size: int = 4096, logger=logging.getLogger()
+) -> int:
+    """
+    Convert text orders to binary records. Invalid lines are reported by
+    BulkInputLexer and skipped.
+
+    :return: Number of written records
+    """
+    lexer = BulkInputLexer(input_stream, logger=logger)
+    count = 0
+    while True:
+        batch = list(islice(lexer, batch_size))
+        if not batch:
+            return count
+        output.write(b"".join(map(encode, batch)))
+        count += len(batch)
+
+
+class BinaryOrderReader:
+    """
+    Reader of binary order records with the same interface as InputLexer.
+
+    The input is read into a reusable buffer of `block_size` records and
+    decoded with struct.iter_unpack over a memoryview of it. Range checks of
+    Order.create are done for the whole block with min and max of every
+    field; only a block which fails them is validated record by record.
+    """
+
+    def __init__(
+        self, input_stream: BinaryIO, block_size: int = 4096, logger=logging.getLogger()
+    ):
+        self.input_stream = input_stream
+        self.block_size = max(block_size, 1)
+        self.__logger = logger
+        self.__record_count = 0
+        self.__orders = self.__read()
+
+    def __iter__(self) -> Iterator[Order]:
+        return self
+
+    def __next__(self) -> Order:
+        return next(self.__orders)
+
+    def get(self) -> Optional[Order]:
+        return next(self.__orders, None)
+
+    def __read(self) -> Iterator[Order]:
+        buffer = bytearray(self.block_size * RECORD.size)
+        view = memoryview(buffer)
+        rest = 0
+        while True:
+            size = rest + self.__fill(view[rest:])
+            end = size - size % RECORD.size
+            if not end:
+                break
+            yield from self.__decode(list(RECORD.iter_unpack(view[:end])))
+            rest = size - end
+            buffer[:rest] = buffer[end:size]
+
+        if rest:
+            self.__logger.error("Truncated record at the end of input: %d bytes", rest)
+
+    def __fill(self, view: memoryview) -> int:
+        """
+        Read until the view is full or the input is exhausted.
+
+        :return: Number of read bytes
+        """
+        size = 0
+        while size < len(view):
+            read = self.input_stream.readinto(view[size:])  # type: ignore
+            if not read:
+                break
+            size += read
+        return size
+
+    def __decode(self, records: List[Record]) -> Iterable[Order]:
+        first = self.__record_count + 1
+        self.__record_count += len(records)
+        directions, order_ids, prices, quantities, peak_sizes = zip(*records)
+
+        orders: List[Optional[Order]]
+        if (
+            {b"B", b"S"}.issuperset(directions)
+            and 0 < min(order_ids)
+            and max(order_ids) <= MAX_ORDER_ID
+            and 0 < min(prices)
+            and max(prices) <= MAX_PRICE
+            and 0 < min(quantities)
+            and max(quantities) <= MAX_QUANTITY
+            and max(peak_sizes) <= MAX_QUANTITY
+        ):
+            orders = [
+                Order(direction == b"B", order_id, price, quantity, peak_size or None)
+                for direction, order_id, price, quantity, peak_size in records
+            ]
+        else:
+            orders = [
+                self.__validate(record, first + i) for i, record in enumerate(records)
+            ]
+
+        if self.__logger.isEnabledFor(INFO):
+            for number, order in enumerate(orders, first):
+                if order is not None:
+                    self.__logger.info("Record %d: %s", number, order)
+        return filter(None, orders)
+
+    def __validate(self, record: Record, number: int) -> Optional[Order]:
+        direction, order_id, price, quantity, peak_size = record
+        if direction not in (b"B", b"S"):
+            self.__logger.error("Unexpected buy direction: %r", direction)
+            order = None
+        else:
+            order = Order.create(
+                direction == b"B",
+                order_id,
+                price,
+                quantity,
+                peak_size or None,
+                self.__logger,
+            )
+
+        if order is None:
+            self.__logger.error("Record %d: Failed to decode order %s", number, record)
+        return order
+
+
+def main(args: Optional[List[str]] = None) -> None:
+    parser = ArgumentParser(
+        prog="python -m orderbook.binary",
+        description="Convert text orders to the binary order format",
+    )
+    parser.add_argument("input", help="text order file, - for stdin")
+    parser.add_argument("output", help="binary order file, - for stdout")
+    options = parser.parse_args(args)
+
+    # Files are closed on exit, the standard streams are left open
+    with ExitStack() as stack:
+        input_stream: IO[str] = sys.stdin
+        if options.input != "-":
+            input_stream = stack.enter_context(open(options.input))
+        output: BinaryIO = sys.stdout.buffer
+        if options.output != "-":
+            output = stack.enter_context(open(options.output, "wb"))
+        convert(input_stream, output)
+        output.flush()
+
+
+if __name__ == "__main__":
+    main()
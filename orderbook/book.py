@@ -1,156 +1,497 @@
-from copy import deepcopy
-from itertools import chain, zip_longest
-from logging import Logger, getLogger
-from typing import Dict, Iterable, List, Tuple
+import os
+from itertools import chain, islice, takewhile, zip_longest
+from logging import DEBUG, Logger, getLogger
+from operator import attrgetter
+from typing import (
+    IO,
+    TYPE_CHECKING,
+    Any,
+    Dict,
+    Generator,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+    Type,
+)
 
-from sortedcontainers import SortedList
+from sortedcontainers import SortedKeyList
 
+from orderbook import snapshot
+from orderbook.events import (
+    DuplicateOrder,
+    OrderExecuted,
+    OrderFilled,
+    PeakUpdated,
+    RecordInserted,
+    TransactionExecuted,
+    emit,
+)
 from orderbook.order import Order
 from orderbook.orderbookrecord import OrderBookRecord
 from orderbook.transaction import Transaction
 
+if TYPE_CHECKING:
+    from orderbook.journal import Journal
 
-class OrderBook:
-    sell: SortedList
-    buy: SortedList
-    timestamp: int
+
+class TableRenderer:
+    """
+    Renderer of the ASCII table of a book.
+
+    Formatted cells are cached per side by order id together with the price
+    and visible peak they show, so a row is formatted again only when one of
+    them changes. The cache is cleared once it grows much larger than the
+    rendered table, which happens only after many records left the book.
+    """
+
+    TOP = (
+        "+-----------------------------------------------------------------+\n"
+        "| BUY                            | SELL                           |\n"
+        "| Id       | Volume      | Price | Price | Volume      | Id       |\n"
+        "+----------+-------------+-------+-------+-------------+----------+"
+    )
+    BOTTOM = "+-----------------------------------------------------------------+"
+    EMPTY_BUY = "|" + " " * 10 + "|" + " " * 13 + "|" + " " * 7
+    EMPTY_SELL = "|" + " " * 7 + "|" + " " * 13 + "|" + " " * 10 + "|"
+    # Rows joined per write of the streaming render
+    CHUNK = 1024
+
+    __buy_cells: Dict[int, Tuple[int, int, str]]
+    __sell_cells: Dict[int, Tuple[int, int, str]]
     __logger: Logger
 
     def __init__(self, logger=getLogger()):
-        self.timestamp = 0
-        self.buy = SortedList()
-        self.sell = SortedList()
+        self.__buy_cells = dict()
+        self.__sell_cells = dict()
         self.__logger = logger
 
-    def __repr__(self):
-        return str([list(self.buy), list(self.sell)])
-
-    def __str__(self):
-        rows = []
-        rows.append(
-            "+-----------------------------------------------------------------+"
-        )
-        rows.append(
-            "| BUY                            | SELL                           |"
-        )
-        rows.append(
-            "| Id       | Volume      | Price | Price | Volume      | Id       |"
-        )
-        rows.append(
-            "+----------+-------------+-------+-------+-------------+----------+"
+    def render(
+        self, buy_side: Iterable, sell_side: Iterable, top_n: Optional[int] = None
+    ) -> str:
+        """
+        :param buy_side: Buy records from the best to the worst
+        :param sell_side: Sell records from the best to the worst
+        :param top_n: Render only the best `top_n` records of every side
+        """
+        return "\n".join(
+            chain((self.TOP,), self.__rows(buy_side, sell_side, top_n), (self.BOTTOM,))
         )
 
-        for row in zip_longest(self.buy, self.sell):
-            buy: OrderBookRecord = row[0]
-            sell: OrderBookRecord = row[1]
-            columns = [""]
+    def write(
+        self,
+        file: IO[str],
+        buy_side: Iterable,
+        sell_side: Iterable,
+        top_n: Optional[int] = None,
+    ) -> None:
+        """
+        Write the same text as render to the file in chunks of rows, without
+        building the whole table in memory.
+        """
+        file.write(self.TOP)
+        rows = self.__rows(buy_side, sell_side, top_n)
+        while True:
+            chunk = list(islice(rows, self.CHUNK))
+            if not chunk:
+                break
+            file.write("\n")
+            file.write("\n".join(chunk))
+        file.write("\n")
+        file.write(self.BOTTOM)
+
+    def __rows(
+        self, buy_side: Iterable, sell_side: Iterable, top_n: Optional[int]
+    ) -> Iterator[str]:
+        if top_n is not None:
+            buy_side, sell_side = islice(buy_side, top_n), islice(sell_side, top_n)
+        buy_cells, sell_cells = self.__buy_cells, self.__sell_cells
+        rendered = 0
+
+        for buy, sell in zip_longest(buy_side, sell_side):
             if buy is None:
-                columns += [" " * 10, " " * 13, " " * 7]
+                buy_cell = self.EMPTY_BUY
             else:
-                columns += [
-                    f"{buy.order_id:10}",
-                    f"{buy.current_peak_size:13,}",
-                    f"{buy.price:7,}",
-                ]
+                cached = buy_cells.get(buy.order_id)
+                if (
+                    cached is None
+                    or cached[0] != buy.price
+                    or cached[1] != buy.current_peak_size
+                ):
+                    cached = buy_cells[buy.order_id] = (
+                        buy.price,
+                        buy.current_peak_size,
+                        f"|{buy.order_id:10}|{buy.current_peak_size:13,}|{buy.price:7,}",
+                    )
+                buy_cell = cached[2]
 
             if sell is None:
-                columns += [" " * 7, " " * 13, " " * 10]
+                sell_cell = self.EMPTY_SELL
             else:
-                columns += [
-                    f"{sell.price:7,}",
-                    f"{sell.current_peak_size:13,}",
-                    f"{sell.order_id:10}",
-                ]
-            columns.append("")
-            row = "|".join(columns)
+                cached = sell_cells.get(sell.order_id)
+                if (
+                    cached is None
+                    or cached[0] != sell.price
+                    or cached[1] != sell.current_peak_size
+                ):
+                    cached = sell_cells[sell.order_id] = (
+                        sell.price,
+                        sell.current_peak_size,
+                        f"|{sell.price:7,}|{sell.current_peak_size:13,}|{sell.order_id:10}|",
+                    )
+                sell_cell = cached[2]
+
+            row = buy_cell + sell_cell
             if len(row) != 67:
                 self.__logger.warning(
                     "Order book line doesn't comply with pretty print constraints"
                 )
-            rows.append(row)
+            rendered += 1
+            yield row
 
-        rows.append(
-            "+-----------------------------------------------------------------+"
-        )
-        return "\n".join(rows)
+        # Most cached cells belong to records which left the book
+        if len(buy_cells) + len(sell_cells) > 2 * rendered + self.CHUNK:
+            buy_cells.clear()
+            sell_cells.clear()
+
+
+class SortedSide(SortedKeyList):
+    """
+    One side of OrderBook as a list of records sorted by their sort keys, so
+    from the best to the worst.
+
+    Every side type of the engine has the same interface: iteration over the
+    records from the best to the worst, len, best, insert, settle and load.
+    """
+
+    is_buy: bool
+    __sort_key = attrgetter("sort_key")
+
+    def __init__(self, is_buy: bool):
+        super().__init__(key=self.__sort_key)
+        self.is_buy = is_buy
+
+    def best(self) -> Optional[Tuple[int, Iterable[OrderBookRecord]]]:
+        """
+        :return: Price and records of the best level, or None for an empty side
+        """
+        if not self:
+            return None
+        price = self[0].price
+        return price, takewhile(lambda record: record.price == price, self)
+
+    def insert(self, order: Order, timestamp: int) -> OrderBookRecord:
+        """
+        :return: Handle of the new record, which is the record itself
+        """
+        record = OrderBookRecord(order, timestamp)
+        self.add(record)
+        return record
+
+    def load(self, records: List[OrderBookRecord]) -> List[OrderBookRecord]:
+        """
+        Add restored records to an empty side. Records are saved from the
+        best to the worst, so sorting them is a single pass over a sorted run.
+
+        :return: Handles of the records in the same order
+        """
+        self.update(records)
+        return records
+
+    def settle(self, price: int, touched: int, timestamp: int) -> None:
+        """
+        Re-position the first `touched` records of the best level after a
+        fill pass. Exhausted records are dropped, and records stamped with
+        `timestamp` move behind the rest of the level.
+        """
+        records = self[:touched]
+        # A partially filled record keeps its place
+        if records[-1].timestamp != timestamp:
+            touched -= 1
+        del self[:touched]
+        self.update(record for record in records[:touched] if record.quantity)
+
+
+class OrderBook:
+    """
+    Matching engine of a single instrument.
+
+    The engine works with any side type which has the interface of
+    SortedSide. A side creates records of inserted orders and returns their
+    handles, which the book indexes by order id and turns into records with
+    _record.
+    """
+
+    side_type: Type = SortedSide
+    sell: SortedSide
+    buy: SortedSide
+    timestamp: int
+    renderer: TableRenderer
+    # Journal of accepted orders, see orderbook.journal
+    journal: Optional["Journal"]
+    __orders: Dict[int, Any]
+    __logger: Logger
+
+    def __init__(self, logger=getLogger()):
+        self.timestamp = 0
+        self.buy = self._new_side(True)
+        self.sell = self._new_side(False)
+        self.__orders = dict()
+        self.__logger = logger
+        self.renderer = TableRenderer(logger)
+        self.journal = None
+
+    def __repr__(self):
+        return str([list(self.buy), list(self.sell)])
+
+    def __str__(self):
+        return self.renderer.render(self.buy, self.sell)
+
+    def __getstate__(self):
+        """
+        Pickle the logger and the binary snapshot of the book.
+        """
+        return self.__logger, self.dumps()
+
+    def __setstate__(self, state) -> None:
+        logger, data = state
+        self.__init__(logger)  # type: ignore
+        self.__load(data)
+
+    def dumps(self) -> bytes:
+        """
+        :return: Binary snapshot of the book, see orderbook.snapshot
+        """
+        return snapshot.encode(self.timestamp, self.buy, self.sell)
+
+    @classmethod
+    def loads(cls, data: bytes, logger=getLogger()) -> "OrderBook":
+        """
+        :return: Book in the state of the snapshot
+        """
+        book = cls(logger)
+        book.__load(data)
+        return book
+
+    def snapshot(self, path: str) -> None:
+        """
+        Write the binary snapshot to the file. The file is replaced only
+        once the new snapshot is completely on disk.
+        """
+        temporary = f"{path}.tmp"
+        with open(temporary, "wb") as file:
+            file.write(self.dumps())
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temporary, path)
+
+    @classmethod
+    def restore(cls, path: str, logger=getLogger()) -> "OrderBook":
+        """
+        :return: Book in the state of the snapshot file
+        """
+        with open(path, "rb") as file:
+            return cls.loads(file.read(), logger)
+
+    def __load(self, data: bytes) -> None:
+        """
+        Replace the state of an empty book with the snapshot.
+        """
+        self.timestamp, buy, sell = snapshot.decode(data)
+        self.__orders = {
+            record.order_id: handle
+            for side, records in ((self.buy, buy), (self.sell, sell))
+            for record, handle in zip(records, side.load(records))
+        }
+
+    def table(self, top_n: Optional[int] = None) -> str:
+        """
+        :param top_n: Show only the best `top_n` records of every side
+        :return: The same table as str(book) for the whole book
+        """
+        return self.renderer.render(self.buy, self.sell, top_n)
+
+    def write_table(self, file: IO[str], top_n: Optional[int] = None) -> None:
+        """
+        Write the table to the file without building it as one string.
+        """
+        self.renderer.write(file, self.buy, self.sell, top_n)
 
     def add(self, order: Order) -> List[Transaction]:
+        return list(self._execute(order))
+
+    def add_many(self, orders: Iterable[Order]) -> List[List[Transaction]]:
+        """
+        Add orders in arrival order.
+
+        What add looks up for every order is looked up once per batch: the
+        index, the sides, the journal and whether insertions are logged. An
+        order which doesn't cross the spread is inserted right away, without
+        the generator and the transaction list add creates for it.
+
+        :param orders: Sequence or any other iterable of orders
+        :return: Transactions of every order, exactly as separate add calls
+        """
+        index, logger, journal = self.__orders, self.__logger, self.journal
+        buy, sell = self.buy, self.sell
+        is_good_price, match, record = self.__is_good_price, self.__match, self._record
+        log_inserted = logger.isEnabledFor(RecordInserted.level)
+
+        results: List[List[Transaction]] = []
+        append = results.append
+        for order in orders:
+            self.timestamp += 1
+            if order.order_id in index:
+                emit(logger, DuplicateOrder, order)
+                append([])
+                continue
+            if journal is not None:
+                journal.append(self.timestamp, order)
+
+            is_buy = order.is_buy
+            best = (sell if is_buy else buy).best()
+            if best is not None and is_good_price(order, best[0]):
+                append(list(match(order, False)))
+            else:
+                handle = (buy if is_buy else sell).insert(order, self.timestamp)
+                index[order.order_id] = handle
+                if log_inserted:
+                    emit(logger, RecordInserted, record(handle))
+                append([])
+        return results
+
+    def find(self, order_id: int) -> Optional[OrderBookRecord]:
+        """
+        :param order_id: Id of the resting order
+        :return: Live record of the order or None if it is not in the book
+        """
+        handle = self.__orders.get(order_id)
+        if handle is None:
+            return None
+        return self._record(handle)
+
+    def process(self, orders: Iterable[Order]) -> Generator[Transaction, None, None]:
+        """
+        Add orders one by one and yield transactions as soon as they happen.
+
+        Transactions are yielded right after a price level is filled, so an
+        order's fills are available before the order is completely matched.
+        Closing the generator in the middle of an order still matches and
+        inserts the rest of that order, only its later fills aren't yielded.
+
+        :param orders: Iterable of orders, e.g. InputLexer
+        """
+        for order in orders:
+            transactions = self._execute(order, stream=True)
+            try:
+                for transaction in transactions:
+                    yield transaction
+            finally:
+                for _ in transactions:
+                    pass
+
+    def _new_side(self, is_buy: bool) -> SortedSide:
+        return self.side_type(is_buy)
+
+    def _record(self, handle) -> OrderBookRecord:
+        """
+        :return: Record of a handle returned by the insert of a side
+        """
+        return handle
+
+    def _execute(self, order: Order, stream: bool = False) -> Iterator[Transaction]:
+        """
+        Match the order against the book and insert the rest of it.
+
+        Transactions are yielded level by level. Unless `stream` is set, they
+        are logged together after the last level, the way add always logged.
+        """
         self.timestamp += 1
-        order = deepcopy(order)
-        for record in chain(self.buy, self.sell):
-            if order.order_id == record.order_id:
-                self.__logger.error(f"Updating orders is prohibited: {order}")
-                return []
+        if order.order_id in self.__orders:
+            emit(self.__logger, DuplicateOrder, order)
+            return
+        if self.journal is not None:
+            self.journal.append(self.timestamp, order)
+        yield from self.__match(order, stream)
+
+    def __match(self, order: Order, stream: bool) -> Iterator[Transaction]:
+        """
+        Match an accepted order and insert the rest of it.
+        """
+        # An order which doesn't cross the spread goes straight to insertion
+        best = (self.sell if order.is_buy else self.buy).best()
+        if best is not None and self.__is_good_price(order, best[0]):
+            order = order.copy()
+            yield from self.__try_to_fill_an_order(order, stream)
 
-        transactions = self.__try_to_fill_an_order(order)
         if order.quantity:
             side = self.buy if order.is_buy else self.sell
-            record = OrderBookRecord(order, self.timestamp)
-            side.add(record)
-            self.__logger.info(f"Record inserted: {record}")
+            handle = side.insert(order, self.timestamp)
+            self.__orders[order.order_id] = handle
+            emit(self.__logger, RecordInserted, self._record(handle))
         else:
-            self.__logger.info(f"{order} was completely executed")
-        return transactions
+            emit(self.__logger, OrderExecuted, order)
 
-    def __try_to_fill_an_order(self, order: Order) -> List[Transaction]:
+    def __try_to_fill_an_order(
+        self, order: Order, stream: bool
+    ) -> Iterator[Transaction]:
         against = self.sell if order.is_buy else self.buy
 
-        transactions: Dict[Tuple[int, int], int] = dict()
-        candidate_records: List[OrderBookRecord] = list(
-            filter(lambda x: self.__is_good_price(order, x), against)
-        )
-
-        for price in self.__unique([x.price for x in candidate_records]):
-            if order.quantity == 0:
+        executed: List[Transaction] = []
+        # Matching goes from the best level, so the records touched by the
+        # order are always a prefix of the level
+        while order.quantity:
+            best = against.best()
+            if best is None or not self.__is_good_price(order, best[0]):
                 break
-            records = list(filter(lambda x: x.price == price, candidate_records))
+            price, level = best
 
-            self.__fill_visible_peak_sizes(order, records, transactions)
+            transactions: Dict[Tuple[int, int], int] = dict()
+            records = self.__fill_visible_peak_sizes(order, level, transactions)
             self.__fill_hidden_iceberg_orders(order, records, transactions)
             self.__fix_empty_records(records)
+            against.settle(price, len(records), self.timestamp)
 
-        against = filter(lambda x: x.quantity != 0, against)
-        if order.is_buy:
-            self.sell = SortedList(against)
-        else:
-            self.buy = SortedList(against)
+            for ((record_id, price), volume) in transactions.items():
+                sell_id = order.order_id
+                buy_id = record_id
+                if order.is_buy:
+                    buy_id, sell_id = sell_id, buy_id
 
-        res: List[Transaction] = []
-        for ((record_id, price), volume) in transactions.items():
-            sell_id = order.order_id
-            buy_id = record_id
-            if order.is_buy:
-                buy_id, sell_id = sell_id, buy_id
+                transaction = Transaction(buy_id, sell_id, price, volume)
+                if stream:
+                    emit(self.__logger, TransactionExecuted, transaction)
+                else:
+                    executed.append(transaction)
+                yield transaction
 
-            res.append(Transaction(buy_id, sell_id, price, volume))
-            self.__logger.info(f"Transaction: {repr(res[-1])}")
-
-        return res
+        for transaction in executed:
+            emit(self.__logger, TransactionExecuted, transaction)
 
     @staticmethod
-    def __is_good_price(order: Order, record: OrderBookRecord) -> bool:
+    def __is_good_price(order: Order, price: int) -> bool:
         if order.is_buy:
-            return order.price >= record.price
+            return order.price >= price
         else:
-            return order.price <= record.price
-
-    @staticmethod
-    def __unique(lst) -> list:
-        res = []
-        for i in lst:
-            if i not in res:
-                res.append(i)
-        return res
+            return order.price <= price
 
     def __fill_visible_peak_sizes(
         self,
         order: Order,
-        records: Iterable[OrderBookRecord],
+        level: Iterable[OrderBookRecord],
         transactions: Dict[Tuple[int, int], int],
-    ) -> None:
-        for record in records:
+    ) -> List[OrderBookRecord]:
+        """
+        :return: Records of the level filled by the order. All records of the
+            level if the order is still not executed
+        """
+        records = []
+        debug = self.__logger.isEnabledFor(DEBUG)
+        for record in level:
             if order.quantity == 0:
                 break
+            records.append(record)
             filled_quantity = min(record.current_peak_size, order.quantity)
             record.current_peak_size -= filled_quantity
             record.quantity -= filled_quantity
@@ -158,9 +499,9 @@ class OrderBook:
             order.quantity -= filled_quantity
 
             transactions[(record.order_id, record.price)] = filled_quantity
-            self.__logger.debug(
-                f"{order} filled by visible {record}. Volume {filled_quantity}"
-            )
+            if debug:
+                self.__logger.debug(OrderFilled(order, record, filled_quantity, False))
+        return records
 
     def __fill_hidden_iceberg_orders(
         self,
@@ -168,6 +509,7 @@ class OrderBook:
         records: Iterable[OrderBookRecord],
         transactions: Dict[Tuple[int, int], int],
     ) -> None:
+        debug = self.__logger.isEnabledFor(DEBUG)
         for record in records:
             if order.quantity == 0:
                 break
@@ -184,20 +526,19 @@ class OrderBook:
 
             record.quantity -= filled_quantity
             order.quantity -= filled_quantity
-            record.timestamp = self.timestamp
+            record.requeue(self.timestamp, record.order_priority)
 
             transactions[(record.order_id, record.price)] += filled_quantity
-            if filled_quantity != 0:
-                self.__logger.debug(
-                    f"{order} filled by hidden {record}. Volume {filled_quantity}"
-                )
+            if filled_quantity != 0 and debug:
+                self.__logger.debug(OrderFilled(order, record, filled_quantity, True))
 
     def __fix_empty_records(self, records: Iterable[OrderBookRecord]) -> None:
         for order_priority, record in enumerate(records):
             assert record.quantity >= 0
             if record.current_peak_size == 0:
                 record.current_peak_size = min(record.quantity, record.max_peak_size)
-                record.timestamp = self.timestamp
-                record.order_priority = order_priority
+                record.requeue(self.timestamp, order_priority)
                 if record.quantity != 0:
-                    self.__logger.debug(f"Peak updated: {record}")
+                    emit(self.__logger, PeakUpdated, record)
+                else:
+                    del self.__orders[record.order_id]
@@ -0,0 +1,285 @@
+from array import array
+from collections import deque
+from itertools import chain
+from logging import getLogger
+from operator import neg
+from typing import Deque, Iterator, List, Optional, Tuple
+
+from sortedcontainers import SortedDict
+
+from orderbook.book import OrderBook
+from orderbook.order import Order
+from orderbook.orderbookrecord import OrderBookRecord
+
+
+class RecordStore:
+    """
+    Resting records stored as parallel columns instead of one object each.
+
+    A record is addressed by an integer slot. Slots of removed records are
+    kept in a free-list and reused by the next allocation, so the columns
+    only grow up to the peak number of resting orders. The columns are
+    plain arrays of machine integers, which are invisible to the garbage
+    collector and cost 8 bytes per field.
+    """
+
+    order_id: array
+    price: array
+    quantity: array
+    max_peak_size: array
+    current_peak_size: array
+    timestamp: array
+    order_priority: array
+    is_buy: array
+    __free: List[int]
+
+    def __init__(self):
+        self.order_id = array("q")
+        self.price = array("q")
+        self.quantity = array("q")
+        self.max_peak_size = array("q")
+        self.current_peak_size = array("q")
+        self.timestamp = array("q")
+        self.order_priority = array("q")
+        self.is_buy = array("b")
+        self.__free = []
+
+    def __len__(self) -> int:
+        return len(self.order_id) - len(self.__free)
+
+    def allocate(self, order: Order, timestamp: int, order_priority: int = 0) -> int:
+        """
+        Store a new record for the order, the same way OrderBookRecord does.
+
+        :return: Slot of the record
+        """
+        max_peak_size = (
+            min(order.peak_size, order.quantity)
+            if order.peak_size is not None
+            else order.quantity
+        )
+        assert order.quantity >= max_peak_size
+
+        values = (
+            order.order_id,
+            order.price,
+            order.quantity,
+            max_peak_size,
+            max_peak_size,
+            timestamp,
+            order_priority,
+            order.is_buy,
+        )
+        return self.__store(values)
+
+    def restore(self, record: OrderBookRecord) -> int:
+        """
+        Store a copy of a restored record with all of its fields.
+
+        :return: Slot of the record
+        """
+        values = (
+            record.order_id,
+            record.price,
+            record.quantity,
+            record.max_peak_size,
+            record.current_peak_size,
+            record.timestamp,
+            record.order_priority,
+            record.is_buy,
+        )
+        return self.__store(values)
+
+    def __store(self, values: Tuple[int, ...]) -> int:
+        columns = self.__columns()
+        if self.__free:
+            slot = self.__free.pop()
+            for column, value in zip(columns, values):
+                column[slot] = value
+        else:
+            slot = len(self.order_id)
+            for column, value in zip(columns, values):
+                column.append(value)
+        return slot
+
+    def release(self, slot: int) -> None:
+        self.quantity[slot] = 0
+        self.__free.append(slot)
+
+    def view(self, slot: int) -> "RecordView":
+        return RecordView(self, slot)
+
+    def __columns(self) -> Tuple[array, ...]:
+        return (
+            self.order_id,
+            self.price,
+            self.quantity,
+            self.max_peak_size,
+            self.current_peak_size,
+            self.timestamp,
+            self.order_priority,
+            self.is_buy,
+        )
+
+
+def _column(name: str) -> property:
+    def get(self):
+        return getattr(self.store, name)[self.slot]
+
+    def set(self, value):
+        getattr(self.store, name)[self.slot] = value
+
+    return property(get, set)
+
+
+class RecordView:
+    """
+    Thin OrderBookRecord-compatible view of a slot in a RecordStore.
+
+    A view is only valid while its record rests in the book: once the slot
+    is released it may be reused by another order.
+    """
+
+    __slots__ = ("store", "slot")
+
+    order_id = _column("order_id")
+    price = _column("price")
+    quantity = _column("quantity")
+    max_peak_size = _column("max_peak_size")
+    current_peak_size = _column("current_peak_size")
+    timestamp = _column("timestamp")
+    order_priority = _column("order_priority")
+
+    def __init__(self, store: RecordStore, slot: int):
+        self.store = store
+        self.slot = slot
+
+    @property
+    def is_buy(self) -> bool:
+        return bool(self.store.is_buy[self.slot])
+
+    @property
+    def sort_key(self) -> Tuple[int, int, int]:
+        return (
+            -self.price if self.is_buy else self.price,
+            self.timestamp,
+            self.order_priority,
+        )
+
+    def requeue(self, timestamp: int, order_priority: int) -> None:
+        self.timestamp = timestamp
+        self.order_priority = order_priority
+
+    __repr__ = OrderBookRecord.__repr__
+
+
+class ColumnarLadder:
+    """
+    PriceLadder counterpart holding record slots of a RecordStore.
+    Iteration yields RecordView objects, so rendering works unchanged.
+    """
+
+    is_buy: bool
+    store: RecordStore
+    levels: SortedDict
+    __length: int
+
+    def __init__(self, is_buy: bool, store: RecordStore):
+        self.is_buy = is_buy
+        self.store = store
+        self.levels = SortedDict(neg) if is_buy else SortedDict()
+        self.__length = 0
+
+    def __len__(self) -> int:
+        return self.__length
+
+    def __iter__(self) -> Iterator[RecordView]:
+        return map(self.store.view, chain.from_iterable(self.levels.values()))
+
+    def best(self) -> Optional[Tuple[int, Iterator[RecordView]]]:
+        """
+        :return: Price and views of the records of the best level, or None
+            for an empty side
+        """
+        if not self.levels:
+            return None
+        price, level = self.levels.peekitem(0)
+        return price, map(self.store.view, level)
+
+    def insert(self, order: Order, timestamp: int) -> int:
+        """
+        :return: Slot of the new record
+        """
+        slot = self.store.allocate(order, timestamp)
+        self.append(slot)
+        return slot
+
+    def append(self, slot: int) -> None:
+        price = self.store.price[slot]
+        level = self.levels.get(price)
+        if level is None:
+            level = self.levels[price] = deque()
+        level.append(slot)
+        self.__length += 1
+
+    def load(self, records: List[OrderBookRecord]) -> List[int]:
+        """
+        Copy restored records, saved from the best to the worst, into the
+        store of an empty side.
+
+        :return: Slots of the records in the same order
+        """
+        slots = [self.store.restore(record) for record in records]
+        for slot in slots:
+            self.append(slot)
+        return slots
+
+    def settle(self, price: int, touched: int, timestamp: int) -> None:
+        """
+        Re-queue the first `touched` slots of a level after a fill pass and
+        release the exhausted ones. Same rules as PriceLadder.requeue.
+        """
+        level: Deque[int] = self.levels[price]
+        quantities, timestamps = self.store.quantity, self.store.timestamp
+
+        head = [level.popleft() for _ in range(touched)]
+        alive = []
+        for slot in head:
+            if quantities[slot]:
+                alive.append(slot)
+            else:
+                self.store.release(slot)
+        self.__length -= touched - len(alive)
+
+        level.extendleft(reversed([x for x in alive if timestamps[x] != timestamp]))
+        level.extend(
+            sorted(
+                (x for x in alive if timestamps[x] == timestamp),
+                key=self.store.order_priority.__getitem__,
+            )
+        )
+        if not level:
+            del self.levels[price]
+
+
+class ColumnarOrderBook(OrderBook):
+    """
+    OrderBook with sides holding record slots of a RecordStore. The slots
+    are the handles of the book, so its index and resting records create no
+    per-record Python objects. Matching, logging, rendering and find go
+    through RecordView objects of the records they use.
+    """
+
+    store: RecordStore
+    sell: ColumnarLadder  # type: ignore
+    buy: ColumnarLadder  # type: ignore
+
+    def __init__(self, logger=getLogger()):
+        self.store = RecordStore()
+        super().__init__(logger)
+
+    def _new_side(self, is_buy: bool) -> ColumnarLadder:  # type: ignore
+        return ColumnarLadder(is_buy, self.store)
+
+    def _record(self, handle: int) -> RecordView:  # type: ignore
+        return self.store.view(handle)
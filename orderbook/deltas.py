@@ -0,0 +1,105 @@
+from itertools import chain
+from logging import getLogger
+from operator import neg
+from typing import Dict, Iterable, Iterator
+
+from sortedcontainers import SortedDict
+
+from orderbook.book import TableRenderer
+
+
+class DeltaRow:
+    """
+    What the table shows of a record.
+    """
+
+    __slots__ = ("is_buy", "order_id", "price", "current_peak_size")
+
+    def __init__(self, is_buy: bool, order_id: int, price: int, current_peak_size: int):
+        self.is_buy = is_buy
+        self.order_id = order_id
+        self.price = price
+        self.current_peak_size = current_peak_size
+
+
+class DeltaBook:
+    """
+    Book rebuilt from the output of DeltaEncoder. Rendering gives the same
+    table as the book which produced the deltas.
+
+    Every side is a sorted index of levels and every level an insertion
+    ordered dict of rows, so any delta takes constant time apart from
+    creating or dropping a level.
+    """
+
+    buy: SortedDict
+    sell: SortedDict
+    renderer: TableRenderer
+    __rows: Dict[int, DeltaRow]
+
+    def __init__(self, logger=getLogger()):
+        self.buy = SortedDict(neg)
+        self.sell = SortedDict()
+        self.__rows = dict()
+        self.renderer = TableRenderer(logger)
+
+    def __str__(self):
+        return self.renderer.render(self.__side(self.buy), self.__side(self.sell))
+
+    def __len__(self) -> int:
+        return len(self.__rows)
+
+    def load(self, lines: Iterable[str]) -> "DeltaBook":
+        for line in lines:
+            self.apply(line)
+        return self
+
+    def apply(self, line: str) -> None:
+        """
+        :param line: Delta line. Transaction lines are skipped
+        :raise ValueError: On a line which is neither
+        """
+        kind, *fields = line.rstrip("\n").split(",")
+        if kind.isdigit():
+            return
+
+        if kind == "I":
+            side, order_id, price, visible = fields
+            self.__insert(
+                DeltaRow(side == "B", int(order_id), int(price), int(visible))
+            )
+        elif kind == "U":
+            self.__rows[int(fields[0])].current_peak_size = int(fields[1])
+        elif kind == "M":
+            row = self.__remove(int(fields[0]))
+            row.current_peak_size = int(fields[1])
+            self.__insert(row)
+        elif kind == "R":
+            self.__remove(int(fields[0]))
+        elif kind == "C":
+            self.buy.clear()
+            self.sell.clear()
+            self.__rows.clear()
+        else:
+            raise ValueError(f"Unexpected delta: {line}")
+
+    def __insert(self, row: DeltaRow) -> None:
+        side = self.buy if row.is_buy else self.sell
+        level = side.get(row.price)
+        if level is None:
+            level = side[row.price] = dict()
+        level[row.order_id] = row
+        self.__rows[row.order_id] = row
+
+    def __remove(self, order_id: int) -> DeltaRow:
+        row = self.__rows.pop(order_id)
+        side = self.buy if row.is_buy else self.sell
+        level = side[row.price]
+        del level[order_id]
+        if not level:
+            del side[row.price]
+        return row
+
+    @staticmethod
+    def __side(side: SortedDict) -> Iterator[DeltaRow]:
+        return chain.from_iterable(level.values() for level in side.values())
@@ -0,0 +1,242 @@
+"""
+Output encoders of the application.
+
+An encoder formats a whole batch of transactions in one call, so the
+application writes once per batch instead of once per transaction.
+"""
+import gzip
+import lzma
+import struct
+import sys
+from abc import ABC, abstractmethod
+from contextlib import nullcontext
+from operator import attrgetter
+from typing import (
+    IO,
+    Callable,
+    ContextManager,
+    Dict,
+    Optional,
+    Sequence,
+    Tuple,
+    Type,
+    Union,
+)
+
+from orderbook.book import OrderBook
+from orderbook.order import Order
+from orderbook.orderbookrecord import OrderBookRecord
+from orderbook.transaction import Transaction
+
+TRADE = struct.Struct("<IIHI")
+
+
+def text_lines(transactions: Sequence[Transaction]) -> str:
+    """
+    :return: A `buy_id,sell_id,price,quantity` line of every transaction
+    """
+    return "".join(
+        [f"{t.buy_id},{t.sell_id},{t.price},{t.quantity}\n" for t in transactions]
+    )
+
+
+class Encoder(ABC):
+    """
+    Base class of encoders. Text encoders return str, binary ones bytes.
+    """
+
+    binary = False
+    header: Union[str, bytes] = ""
+
+    @abstractmethod
+    def transactions(self, transactions: Sequence[Transaction]) -> Union[str, bytes]:
+        """
+        :return: Output of a batch of transactions
+        """
+
+
+class BookEncoder(Encoder):
+    """
+    Encoder which writes the book after every order. The application writes
+    only the trade tape with other encoders.
+    """
+
+    @abstractmethod
+    def order(
+        self, order: Order, transactions: Sequence[Transaction], book: OrderBook
+    ) -> Union[str, bytes]:
+        """
+        :return: Output of a single order
+        """
+
+
+class TextEncoder(BookEncoder):
+    """
+    The original output: transactions as `buy_id,sell_id,price,quantity`
+    lines followed by the book table after every order.
+    """
+
+    # Show only the best records of every side
+    top_n: Optional[int] = None
+
+    def transactions(self, transactions: Sequence[Transaction]) -> str:
+        return text_lines(transactions)
+
+    def order(
+        self, order: Order, transactions: Sequence[Transaction], book: OrderBook
+    ) -> str:
+        return f"{self.transactions(transactions)}{book.table(self.top_n)}\n"
+
+
+class CsvEncoder(Encoder):
+    """
+    Trade tape in CSV with a header. All fields are integers, so nothing
+    needs quoting.
+    """
+
+    header = "buy_id,sell_id,price,quantity\n"
+
+    def transactions(self, transactions: Sequence[Transaction]) -> str:
+        return text_lines(transactions)
+
+
+class JsonLinesEncoder(Encoder):
+    """
+    Trade tape with a JSON object per line.
+    """
+
+    def transactions(self, transactions: Sequence[Transaction]) -> str:
+        return "".join(
+            [
+                f'{{"buy_id":{t.buy_id},"sell_id":{t.sell_id},'
+                f'"price":{t.price},"quantity":{t.quantity}}}\n'
+                for t in transactions
+            ]
+        )
+
+
+class BinaryEncoder(Encoder):
+    """
+    Trade tape of fixed-width 14 byte little-endian records: uint32 buy id,
+    uint32 sell id, uint16 price and uint32 quantity.
+    """
+
+    binary = True
+    header = b""
+
+    def transactions(self, transactions: Sequence[Transaction]) -> bytes:
+        pack = TRADE.pack
+        return b"".join(
+            [pack(t.buy_id, t.sell_id, t.price, t.quantity) for t in transactions]
+        )
+
+
+class DeltaEncoder(TextEncoder):
+    """
+    Transactions followed by the changes of the book made by the order
+    instead of the whole table:
+
+        I,B,id,price,visible    record inserted at the back of its level
+        U,id,visible            visible peak changed, the record kept its place
+        M,id,visible            record moved to the back of its level
+        R,id                    record removed
+
+    Moves of one order are written in the new queue order. Every
+    `snapshot_every` orders, if set, the book is written in full as a C
+    (clear) line and inserts of all records. DeltaBook rebuilds the table
+    from this output.
+
+    Only records which traded can change, so the cost of an order depends on
+    the number of its transactions, not on the depth of the book.
+    """
+
+    snapshot_every = 0
+    # id -> (visible, timestamp, order_priority) of every written record
+    __records: Dict[int, Tuple[int, int, int]]
+    __orders: int
+
+    def __init__(self):
+        self.__records = dict()
+        self.__orders = 0
+
+    def order(
+        self, order: Order, transactions: Sequence[Transaction], book: OrderBook
+    ) -> str:
+        self.__orders += 1
+        if self.snapshot_every and self.__orders % self.snapshot_every == 0:
+            return self.transactions(transactions) + self.snapshot(book)
+
+        rows = [self.transactions(transactions)]
+        moved = []
+        for order_id in dict.fromkeys(
+            t.sell_id if order.is_buy else t.buy_id for t in transactions
+        ):
+            record = book.find(order_id)
+            if record is None:
+                del self.__records[order_id]
+                rows.append(f"R,{order_id}\n")
+                continue
+
+            visible, timestamp, order_priority = self.__records[order_id]
+            if (timestamp, order_priority) != (record.timestamp, record.order_priority):
+                moved.append(record)
+            elif visible != record.current_peak_size:
+                rows.append(f"U,{order_id},{record.current_peak_size}\n")
+            self.__remember(record)
+
+        # Ties keep the transaction order, the same way the engines re-queue
+        moved.sort(key=attrgetter("order_priority"))
+        rows += [f"M,{r.order_id},{r.current_peak_size}\n" for r in moved]
+
+        if order.order_id not in self.__records:
+            record = book.find(order.order_id)
+            if record is not None:
+                rows.append(self.__insert(record))
+        return "".join(rows)
+
+    def snapshot(self, book: OrderBook) -> str:
+        self.__records.clear()
+        rows = ["C\n"]
+        rows += [self.__insert(record) for record in book.buy]
+        rows += [self.__insert(record) for record in book.sell]
+        return "".join(rows)
+
+    def __insert(self, record: OrderBookRecord) -> str:
+        self.__remember(record)
+        side = "B" if record.is_buy else "S"
+        return f"I,{side},{record.order_id},{record.price},{record.current_peak_size}\n"
+
+    def __remember(self, record: OrderBookRecord) -> None:
+        self.__records[record.order_id] = (
+            record.current_peak_size,
+            record.timestamp,
+            record.order_priority,
+        )
+
+
+ENCODERS: Dict[str, Type[Encoder]] = {
+    "text": TextEncoder,
+    "csv": CsvEncoder,
+    "jsonl": JsonLinesEncoder,
+    "binary": BinaryEncoder,
+    "deltas": DeltaEncoder,
+}
+
+COMPRESSORS: Dict[str, Callable[..., IO]] = {"gzip": gzip.open, "lzma": lzma.open}
+
+
+def open_output(
+    path: Optional[str], binary: bool, compression: Optional[str] = None
+) -> ContextManager[IO]:
+    """
+    :param path: Output file or None for stdout. Stdout is never closed
+    :param binary: Whether the stream takes bytes rather than str
+    :param compression: None or one of COMPRESSORS
+    :return: Context manager of the output stream
+    """
+    if compression is not None:
+        target = sys.stdout.buffer if path is None else path
+        return COMPRESSORS[compression](target, "wb" if binary else "wt")
+    if path is not None:
+        return open(path, "wb" if binary else "w")
+    return nullcontext(sys.stdout.buffer if binary else sys.stdout)
@@ -0,0 +1,215 @@
+"""
+Structured events of the matching engines.
+
+An event keeps the raw fields of what happened. Records and orders are
+mutated during matching, so their fields are copied into tuples when the
+event is created. Events are passed to logging as messages and formatted
+only when a handler emits them, possibly later and in another thread.
+Engines create events only if their logger is enabled for the level.
+"""
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from logging import DEBUG, ERROR, INFO, Handler, Logger, LogRecord
+from logging.handlers import QueueHandler, QueueListener
+from queue import SimpleQueue
+from typing import Iterator, Optional, Tuple, Union
+
+from orderbook.order import Order
+from orderbook.transaction import Transaction
+
+# is_buy, price, timestamp, order_priority, current_peak_size, max_peak_size,
+# quantity, order_id
+RecordFields = Tuple[bool, int, int, int, int, int, int, int]
+# is_buy, order_id, price, quantity, peak_size
+OrderFields = Tuple[bool, int, int, int, Optional[int]]
+
+
+def record_fields(record) -> RecordFields:
+    """
+    :param record: OrderBookRecord or any object with the same attributes
+    """
+    return (
+        record.is_buy,
+        record.price,
+        record.timestamp,
+        record.order_priority,
+        record.current_peak_size,
+        record.max_peak_size,
+        record.quantity,
+        record.order_id,
+    )
+
+
+def format_record(fields: RecordFields) -> str:
+    """
+    :return: The same text as repr of the record
+    """
+    is_buy, price, timestamp, priority, visible, max_peak, quantity, order_id = fields
+    return (
+        f"{'B' if is_buy else 'S'},(p:{price},t:{timestamp},n:{priority})"
+        f"->(visible:{visible},m:{max_peak},q:{quantity})->(Id:{order_id})"
+    )
+
+
+def order_fields(order: Order) -> OrderFields:
+    return order.is_buy, order.order_id, order.price, order.quantity, order.peak_size
+
+
+def format_order(fields: OrderFields) -> str:
+    """
+    :return: The same text as repr of the order
+    """
+    is_buy, order_id, price, quantity, peak_size = fields
+    return f"{'B' if is_buy else 'S'},{order_id},{price},{quantity},{peak_size}"
+
+
+class Event(ABC):
+    __slots__ = ()
+
+    level = INFO
+
+    @abstractmethod
+    def __str__(self):
+        """
+        :return: Log message of the event
+        """
+
+
+class DuplicateOrder(Event):
+    __slots__ = ("order",)
+
+    level = ERROR
+    order: OrderFields
+
+    def __init__(self, order: Order):
+        self.order = order_fields(order)
+
+    def __str__(self):
+        return f"Updating orders is prohibited: {format_order(self.order)}"
+
+
+class RecordInserted(Event):
+    __slots__ = ("record",)
+
+    record: RecordFields
+
+    def __init__(self, record):
+        self.record = record_fields(record)
+
+    def __str__(self):
+        return f"Record inserted: {format_record(self.record)}"
+
+
+class OrderExecuted(Event):
+    __slots__ = ("order",)
+
+    order: OrderFields
+
+    def __init__(self, order: Order):
+        self.order = order_fields(order)
+
+    def __str__(self):
+        return f"{format_order(self.order)} was completely executed"
+
+
+class TransactionExecuted(Event):
+    __slots__ = ("buy_id", "sell_id", "price", "quantity")
+
+    def __init__(self, transaction: Transaction):
+        self.buy_id = transaction.buy_id
+        self.sell_id = transaction.sell_id
+        self.price = transaction.price
+        self.quantity = transaction.quantity
+
+    def __str__(self):
+        return (
+            f"Transaction: <{self.buy_id},{self.sell_id},{self.price},{self.quantity}>"
+        )
+
+
+class OrderFilled(Event):
+    __slots__ = ("order", "record", "volume", "hidden")
+
+    level = DEBUG
+    order: OrderFields
+    record: RecordFields
+
+    def __init__(self, order: Order, record, volume: int, hidden: bool):
+        self.order = order_fields(order)
+        self.record = record_fields(record)
+        self.volume = volume
+        self.hidden = hidden
+
+    def __str__(self):
+        return (
+            f"{format_order(self.order)} filled by "
+            f"{'hidden' if self.hidden else 'visible'} "
+            f"{format_record(self.record)}. Volume {self.volume}"
+        )
+
+
+class PeakUpdated(Event):
+    __slots__ = ("record",)
+
+    level = DEBUG
+    record: RecordFields
+
+    def __init__(self, record):
+        self.record = record_fields(record)
+
+    def __str__(self):
+        return f"Peak updated: {format_record(self.record)}"
+
+
+def emit(logger: Logger, event_type, *args) -> None:
+    """
+    Create and log the event only if the logger is enabled for its level.
+
+    :param event_type: Event subclass
+    :param args: Arguments of the event constructor
+    """
+    if logger.isEnabledFor(event_type.level):
+        logger.log(event_type.level, event_type(*args), stacklevel=2)
+
+
+class EventQueueHandler(QueueHandler):
+    """
+    QueueHandler which leaves formatting of events to the listener.
+
+    The standard handler formats every record before queueing it. Events
+    copy what they show when they are created, so records of events are
+    queued as they are and the matching thread only pays for a put. Other
+    records may refer to objects which change later, so they are formatted
+    the standard way.
+    """
+
+    def prepare(self, record: LogRecord) -> LogRecord:
+        if isinstance(record.msg, Event) and not record.args:
+            return record
+        return super().prepare(record)
+
+
+@contextmanager
+def background_logging(
+    logger: Logger, *handlers: Handler, level: Union[int, str, None] = None
+) -> Iterator[QueueListener]:
+    """
+    Pass records of the logger to the handlers from a background thread.
+    Records left in the queue are handled on exit.
+
+    :param level: Level of the logger while the context is active
+    """
+    queue: SimpleQueue = SimpleQueue()
+    handler = EventQueueHandler(queue)
+    listener = QueueListener(queue, *handlers, respect_handler_level=True)
+    previous_level = logger.level
+    if level is not None:
+        logger.setLevel(level)
+    logger.addHandler(handler)
+    listener.start()
+    try:
+        yield listener
+    finally:
+        logger.removeHandler(handler)
+        listener.stop()
+        logger.setLevel(previous_level)
@@ -0,0 +1,253 @@
+"""
+Asyncio order gateway.
+
+Clients connect over TCP or a Unix socket and send orders in the text
+format, one per line. Every client gets back the transactions of its own
+orders, including fills of its resting orders by other clients, in the
+`buy_id,sell_id,price,quantity` format, and `ERROR,<line number>` for
+every line which is not an order, a comment or empty, or whose order the
+book fails to match. Replies keep the order of the lines.
+
+If the book has a journal, replies are held back until the journal entries
+of the orders before them are on disk. The journal syncs a group when it
+is full, and the gateway syncs it as soon as no more orders are waiting,
+so an idle gateway never leaves entries or replies pending.
+"""
+import asyncio
+import signal
+from contextlib import suppress
+from logging import getLogger
+from typing import Dict, List, Optional, Tuple, Union
+
+from orderbook.book import OrderBook
+from orderbook.order import Order
+
+
+class OrderGateway:
+    """
+    A single matching task owns the book. Connections parse lines on their
+    own and pass orders to it through a bounded queue, so a client which
+    sends faster than the book matches is paused instead of piling up
+    orders in memory. Every connection buffers at most `line_limit` bytes of
+    a line, longer lines are dropped.
+    """
+
+    book: OrderBook
+    line_limit: int
+    # Orders to match, error replies which wait for the orders before them, or
+    # None to close the connection after its last reply, with their line numbers
+    __queue: "asyncio.Queue[Tuple[Union[Order, bytes, None], int, asyncio.StreamWriter]]"
+    __owners: Dict[int, asyncio.StreamWriter]
+    # Replies waiting for the journal
+    __held: List[Tuple[Optional[asyncio.StreamWriter], bytes]]
+    __matcher: Optional["asyncio.Task[None]"]
+    __clients: int
+
+    def __init__(
+        self,
+        book: Optional[OrderBook] = None,
+        line_limit: int = 1024,
+        queue_size: int = 1024,
+        logger=getLogger(),
+    ):
+        self.book = OrderBook(logger) if book is None else book
+        # Orders are never longer than 40 characters
+        self.line_limit = max(line_limit, 41)
+        self.__queue_size = queue_size
+        self.__logger = logger
+        self.__owners = dict()
+        self.__held = []
+        self.__matcher = None
+        self.__clients = 0
+
+    async def start_tcp(self, host: str, port: int) -> asyncio.AbstractServer:
+        self.__start_matcher()
+        return await asyncio.start_server(
+            self.__serve_client, host, port, limit=self.line_limit
+        )
+
+    async def start_unix(self, path: str) -> asyncio.AbstractServer:
+        self.__start_matcher()
+        return await asyncio.start_unix_server(
+            self.__serve_client, path, limit=self.line_limit
+        )
+
+    async def close(self) -> None:
+        """
+        Stop the matching task. Orders still in the queue are not matched.
+        """
+        if self.__matcher is not None:
+            self.__matcher.cancel()
+            try:
+                await self.__matcher
+            except asyncio.CancelledError:
+                pass
+            self.__matcher = None
+
+    def __start_matcher(self) -> None:
+        if self.__matcher is None:
+            self.__queue = asyncio.Queue(self.__queue_size)
+            self.__matcher = asyncio.ensure_future(self.__match())
+
+    async def __match(self) -> None:
+        book = self.book
+        while True:
+            order, line_count, writer = await self.__queue.get()
+            if order is None:
+                self.__commit()
+                writer.close()
+                continue
+            if isinstance(order, bytes):
+                self.__send(writer, order)
+            else:
+                self.__add(order, line_count, writer)
+
+            journal = book.journal
+            if journal is None or not journal.pending or self.__queue.empty():
+                self.__commit()
+
+    def __add(
+        self, order: Order, line_count: int, writer: asyncio.StreamWriter
+    ) -> None:
+        book, owners = self.book, self.__owners
+        is_new = book.find(order.order_id) is None
+
+        # Fills are sent as they happen, so they are not lost if matching
+        # fails later
+        try:
+            for transaction in book.process((order,)):
+                data = f"{transaction}\n".encode()
+                self.__send(writer, data)
+
+                resting_id = transaction.sell_id if order.is_buy else transaction.buy_id
+                owner = owners.get(resting_id)
+                if owner is not writer:
+                    self.__send(owner, data)
+                if book.find(resting_id) is None:
+                    owners.pop(resting_id, None)
+        except Exception:
+            # Only the client of the order is told, others keep trading
+            self.__logger.exception("Failed to match order %s", order)
+            self.__send(writer, f"ERROR,{line_count}\n".encode())
+
+        if is_new and book.find(order.order_id) is not None:
+            owners[order.order_id] = writer
+
+    def __send(self, writer: Optional[asyncio.StreamWriter], data: bytes) -> None:
+        self.__held.append((writer, data))
+
+    def __commit(self) -> None:
+        """
+        Sync the journal and write the held replies.
+        """
+        journal = self.book.journal
+        if journal is not None and journal.pending:
+            journal.sync()
+        for writer, data in self.__held:
+            # Resting orders outlive connections of their clients
+            if writer is not None and not writer.is_closing():
+                writer.write(data)
+        self.__held.clear()
+
+    async def __serve_client(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        self.__clients += 1
+        client = self.__clients
+        line_count = 0
+        is_cut = False
+        try:
+            while True:
+                try:
+                    data = await reader.readuntil(b"\n")
+                except asyncio.IncompleteReadError as error:
+                    data = error.partial
+                    if not data:
+                        break
+                except asyncio.LimitOverrunError as error:
+                    # Drop the buffered part, the rest is dropped with the line
+                    await reader.readexactly(error.consumed)
+                    is_cut = True
+                    continue
+
+                line_count += 1
+                item = self.__parse(client, line_count, data, is_cut)
+                is_cut = False
+                if item is not None:
+                    await self.__queue.put((item, line_count, writer))
+                # Replies of a client which doesn't read them hold back its orders
+                await writer.drain()
+        except ConnectionError:
+            self.__logger.info("Client %d: Connection lost", client)
+        finally:
+            if self.__matcher is None:
+                writer.close()
+            else:
+                await self.__queue.put((None, line_count, writer))
+
+    def __parse(
+        self, client: int, line_count: int, data: bytes, is_cut: bool
+    ) -> Union[Order, bytes, None]:
+        """
+        :return: Order, error reply for rejected lines or None for comments and
+            empty lines
+        """
+        if is_cut:
+            self.__logger.error(
+                "Client %d, line %d: Input string is too long", client, line_count
+            )
+            return f"ERROR,{line_count}\n".encode()
+
+        line = data.decode("utf-8", "replace")
+        stripped = line.lstrip()
+        if len(stripped) < len(line):
+            if stripped and stripped[0] != "#":
+                self.__logger.error(
+                    "Client %d, line %d: "
+                    "Starts with whitespaces but is not a comment or empty.",
+                    client,
+                    line_count,
+                )
+                return f"ERROR,{line_count}\n".encode()
+            return None
+
+        order = Order.from_string(line, self.__logger)
+        if order is None:
+            self.__logger.error(
+                "Client %d, line %d: Failed to parse order %s", client, line_count, line
+            )
+            return f"ERROR,{line_count}\n".encode()
+        return order
+
+
+async def serve(
+    book: OrderBook,
+    host: str = "127.0.0.1",
+    port: Optional[int] = None,
+    path: Optional[str] = None,
+) -> None:
+    """
+    Serve the book on a TCP port and/or a Unix socket until cancelled or
+    until the process gets SIGTERM, which returns normally.
+    """
+    gateway = OrderGateway(book)
+    servers = []
+    if port is not None:
+        servers.append(await gateway.start_tcp(host, port))
+    if path is not None:
+        servers.append(await gateway.start_unix(path))
+
+    loop = asyncio.get_running_loop()
+    terminated = loop.create_future()
+    loop.add_signal_handler(signal.SIGTERM, terminated.set_result, None)
+    serving = asyncio.gather(*(server.serve_forever() for server in servers))
+    try:
+        await asyncio.wait([serving, terminated], return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        loop.remove_signal_handler(signal.SIGTERM)
+        serving.cancel()
+        with suppress(asyncio.CancelledError):
+            await serving
+        for server in servers:
+            server.close()
+        await gateway.close()
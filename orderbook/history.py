@@ -0,0 +1,156 @@
+"""
+Book at any point of an order journal.
+
+    python -m orderbook.history orders.journal --sequence 1000
+
+The history replays the journal once and keeps a binary snapshot of the book
+every `interval` entries. Journal entries have a fixed size, so the offset
+of the entry after a checkpoint is computed from its sequence number, and a
+query loads the nearest checkpoint before the requested point and replays at
+most `interval - 1` entries from that offset.
+"""
+import logging
+from argparse import ArgumentParser
+from bisect import bisect_right
+from itertools import islice, takewhile
+from typing import Iterable, List, Optional, Tuple
+
+from orderbook.book import OrderBook
+from orderbook.journal import read_journal
+from orderbook.order import Order
+
+
+class BookHistory:
+    """
+    Checkpoints of the book of a journal. The sequence number of an order is
+    its position among the journal entries after the snapshot, from 1, the
+    book at sequence number 0 is the book before them, empty or loaded from
+    `snapshot_path`. Journal.checkpoint empties the journal, so a history is
+    built of a journal which is only appended to.
+
+    A crash during Journal.checkpoint leaves entries which the snapshot
+    already contains at the start of the journal. They are skipped and not
+    numbered, the same way recover skips them.
+    """
+
+    journal_path: str
+    interval: int
+    # Sequence numbers, book timestamps and snapshots of the checkpoints
+    __sequences: List[int]
+    __timestamps: List[int]
+    __snapshots: List[bytes]
+
+    def __init__(
+        self,
+        journal_path: str,
+        interval: int = 1024,
+        snapshot_path: Optional[str] = None,
+        logger=logging.getLogger(),
+    ):
+        self.journal_path = journal_path
+        self.interval = max(interval, 1)
+        self.__logger = logger
+        if snapshot_path is None:
+            self.__book = OrderBook(logger)
+        else:
+            self.__book = OrderBook.restore(snapshot_path, logger)
+        self.__length = 0
+        # Leading journal entries not newer than the snapshot
+        self.__skipped = 0
+        self.__sequences = [0]
+        self.__timestamps = [self.__book.timestamp]
+        self.__snapshots = [self.__book.dumps()]
+        self.update()
+
+    def __len__(self) -> int:
+        """
+        :return: Number of indexed orders
+        """
+        return self.__length
+
+    def update(self) -> None:
+        """
+        Index orders appended to the journal since the last update.
+        """
+        book, start = self.__book, self.__timestamps[0]
+        entries = read_journal(
+            self.journal_path, self.__logger, self.__skipped + self.__length
+        )
+        for timestamp, order in entries:
+            if timestamp <= start:
+                self.__skipped += 1
+                continue
+            book.timestamp = timestamp - 1
+            book.add(order)
+            self.__length += 1
+            if self.__length % self.interval == 0:
+                self.__sequences.append(self.__length)
+                self.__timestamps.append(book.timestamp)
+                self.__snapshots.append(book.dumps())
+
+    def at_sequence(self, sequence: int) -> OrderBook:
+        """
+        :return: New book after the order with the sequence number
+        """
+        if not 0 <= sequence <= self.__length:
+            raise IndexError(f"Sequence number out of range: {sequence}")
+
+        index = bisect_right(self.__sequences, sequence) - 1
+        book = OrderBook.loads(self.__snapshots[index], self.__logger)
+        start = self.__sequences[index]
+        entries = read_journal(self.journal_path, self.__logger, self.__skipped + start)
+        self.__replay(book, islice(entries, sequence - start))
+        return book
+
+    def at_timestamp(self, timestamp: int) -> OrderBook:
+        """
+        :return: New book as it stood at the book timestamp, after every
+            order up to it
+        """
+        if timestamp < self.__timestamps[0]:
+            raise IndexError(f"Timestamp is before the history: {timestamp}")
+
+        index = bisect_right(self.__timestamps, timestamp) - 1
+        book = OrderBook.loads(self.__snapshots[index], self.__logger)
+        start = self.__sequences[index]
+        entries = read_journal(self.journal_path, self.__logger, self.__skipped + start)
+        # Timestamps of entries grow, duplicates left gaps between them
+        entries = islice(entries, self.__length - start)
+        self.__replay(book, takewhile(lambda entry: entry[0] <= timestamp, entries))
+        book.timestamp = timestamp
+        return book
+
+    @staticmethod
+    def __replay(book: OrderBook, entries: Iterable[Tuple[int, Order]]) -> None:
+        """
+        Add orders with the timestamps they had.
+        """
+        for timestamp, order in entries:
+            book.timestamp = timestamp - 1
+            book.add(order)
+
+
+def main(args: Optional[List[str]] = None) -> None:
+    parser = ArgumentParser(
+        prog="python -m orderbook.history",
+        description="Print the book at a point of an order journal",
+    )
+    parser.add_argument("journal", help="order journal")
+    parser.add_argument("--snapshot", help="snapshot the journal starts from")
+    parser.add_argument(
+        "--interval", type=int, default=1024, help="orders per checkpoint"
+    )
+    point = parser.add_mutually_exclusive_group(required=True)
+    point.add_argument("--sequence", type=int, help="number of orders from the start")
+    point.add_argument("--timestamp", type=int, help="book timestamp")
+    options = parser.parse_args(args)
+
+    history = BookHistory(options.journal, options.interval, options.snapshot)
+    if options.sequence is not None:
+        print(history.at_sequence(options.sequence))
+    else:
+        print(history.at_timestamp(options.timestamp))
+
+
+if __name__ == "__main__":
+    main()
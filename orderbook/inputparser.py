@@ -1,8 +1,14 @@
 import logging
-from typing import Optional, Tuple
+import mmap
+import os
+from itertools import islice
+from typing import Iterator, Optional, Tuple, Union
 
 from orderbook.order import Order
 
+# Line without its ending, length of the line with the ending and the ending
+Line = Tuple[Union[bytes, memoryview], int, str]
+
 
 class InputLexer:
     def __init__(
@@ -13,6 +19,15 @@ class InputLexer:
         self.__logger = logger
         self.__line_count = 0
 
+    def __iter__(self) -> Iterator[Order]:
+        return self
+
+    def __next__(self) -> Order:
+        order = self.get()
+        if order is None:
+            raise StopIteration
+        return order
+
     def get(self) -> Optional[Order]:
         while True:
             self.__line_count += 1
@@ -21,21 +36,21 @@ class InputLexer:
                 return None
 
             if not buffer:
-                self.__logger.info(f"Line {self.__line_count}: Whitespace string.")
+                self.__logger.info("Line %d: Whitespace string.", self.__line_count)
                 continue
 
             if whitespace_started and buffer[0] == "#":
                 if buffer[-1] != "\n":
                     self.__skip_rest_of_the_line()
-                self.__logger.info(f"Line {self.__line_count}: Comment string.")
+                self.__logger.info("Line %d: Comment string.", self.__line_count)
                 continue
 
             if whitespace_started:
                 if buffer[-1] != "\n":
                     self.__skip_rest_of_the_line()
                 self.__logger.error(
-                    f"Line {self.__line_count}: "
-                    f"Starts with whitespaces but is not a comment or empty."
+                    "Line %d: Starts with whitespaces but is not a comment or empty.",
+                    self.__line_count,
                 )
                 continue
 
@@ -44,11 +59,11 @@ class InputLexer:
 
             if order is None:
                 self.__logger.error(
-                    f"Line {self.__line_count}: Failed to parse order {buffer}"
+                    "Line %d: Failed to parse order %s", self.__line_count, buffer
                 )
                 continue
 
-            self.__logger.info(f"Line {self.__line_count}: {order}")
+            self.__logger.info("Line %d: %s", self.__line_count, order)
             return order
 
     def __skip_whitespaces(self) -> Tuple[str, bool]:
@@ -87,3 +102,229 @@ class InputLexer:
             buffer = self.input_stream.readline(self.buffer_limit)
             res += buffer
         return res
+
+
+class BulkInputLexer:
+    """
+    InputLexer for large inputs.
+
+    The input is read in blocks of `block_size`, from the binary buffer of a
+    text stream when there is one, and split into lines with bytes.split.
+    Lines which start with visible ASCII are order lines and are decoded only
+    to be parsed, other lines are decoded to find comments. Comments,
+    whitespace lines and errors are reported exactly as InputLexer does, but
+    messages are formatted by logging only if they are going to be emitted.
+
+    Memory is bounded by `line_limit` rather than by the longest line: longer
+    lines are cut, and the error message of such order shows only the first
+    `line_limit` characters. Lines are never shorter than 41 characters, the
+    longest valid order, so no valid order is affected.
+    """
+
+    # ASCII characters str.isspace accepts
+    WHITESPACE = b" \t\n\r\x0b\x0c\x1c\x1d\x1e\x1f"
+
+    def __init__(
+        self,
+        input_stream,
+        block_size: int = 2 ** 16,
+        line_limit: int = 1024,
+        logger=logging.getLogger(),
+    ):
+        self.input_stream = input_stream
+        self.block_size = block_size
+        self.line_limit = max(line_limit, 41)
+        self.__logger = logger
+        self.__order_lines = self.lines()
+
+    def __iter__(self) -> Iterator[Order]:
+        return self
+
+    def __next__(self) -> Order:
+        order = self.get()
+        if order is None:
+            raise StopIteration
+        return order
+
+    def get(self) -> Optional[Order]:
+        for line_count, buffer in self.__order_lines:
+            order = Order.from_string(buffer, self.__logger)
+            if order is None:
+                self.__logger.error(
+                    "Line %d: Failed to parse order %s", line_count, buffer
+                )
+                continue
+
+            self.__logger.info("Line %d: %s", line_count, order)
+            return order
+        return None
+
+    def lines(self) -> Iterator[Tuple[int, str]]:
+        """
+        Order lines of the input. Whitespace lines, comments, lines which
+        start with whitespaces and over-long lines are reported and skipped.
+
+        :return: Generator of (line number, line with its ending) pairs
+        """
+        line_count = 0
+        for data, length, ending in self._read_lines():
+            line_count += 1
+            is_cut = length > len(data) + len(ending)
+            line = None
+            # A line starting with visible ASCII is an order line, others
+            # are classified on their text
+            if not data or data[0] >= 128 or data[0] in self.WHITESPACE:
+                line = str(data, "utf-8", "replace")
+                stripped = line.lstrip()
+                if not stripped:
+                    self.__logger.info("Line %d: Whitespace string.", line_count)
+                    continue
+
+                if len(stripped) < len(line):
+                    if stripped[0] == "#":
+                        self.__logger.info("Line %d: Comment string.", line_count)
+                    else:
+                        self.__logger.error(
+                            "Line %d: Starts with whitespaces but is not a comment or empty.",
+                            line_count,
+                        )
+                    continue
+
+            if line is None:
+                line = str(data, "utf-8", "replace")
+            buffer = line + ending
+            if is_cut:
+                self.__logger.error("Input string is too long: %d", length)
+                self.__logger.error(
+                    "Line %d: Failed to parse order %s", line_count, buffer
+                )
+                continue
+            yield line_count, buffer
+
+    def _read_lines(self) -> Iterator[Line]:
+        """
+        :return:
+            Generator of (line, length, ending) tuples. The line has no line
+            ending and is cut if it is longer than line_limit, length is the
+            real length of the line with the ending
+        """
+        stream = getattr(self.input_stream, "buffer", self.input_stream)
+        # Text streams translate line endings, their buffers do not
+        translate = stream is not self.input_stream
+        tail = b""
+        tail_length = 0
+
+        while True:
+            block = stream.read(self.block_size)
+            if not block:
+                break
+            if isinstance(block, str):
+                block = block.encode()
+            if translate:
+                # "\r" may be the first half of "\r\n" split between blocks
+                while block.endswith(b"\r"):
+                    more = stream.read(1)
+                    if not more:
+                        break
+                    block += more
+                block = block.replace(b"\r\n", b"\n").replace(b"\r", b"\n")
+
+            lines = block.split(b"\n")
+            if tail_length:
+                tail_length += len(lines[0])
+                lines[0] = self._cut(tail + lines[0])
+
+            for line in islice(lines, len(lines) - 1):
+                length = tail_length or len(line)
+                tail_length = 0
+                if len(line) > self.line_limit:
+                    line = self._cut(line)
+                yield line, length + 1, "\n"
+
+            tail = self._cut(lines[-1])
+            tail_length = tail_length or len(lines[-1])
+
+        if tail_length:
+            yield tail, tail_length, ""
+
+    def _cut(self, line: bytes) -> bytes:
+        """
+        Bound the line by line_limit. A leading run of whitespaces is cut to
+        one character first, so the line keeps its classification.
+        """
+        if len(line) <= self.line_limit:
+            return line
+        stripped = line.lstrip(self.WHITESPACE)
+        if len(stripped) < len(line):
+            line = line[:1] + stripped
+        return line[: self.line_limit + 1]
+
+
+class MappedInputLexer(BulkInputLexer):
+    """
+    BulkInputLexer reading a file through mmap.
+
+    Line boundaries are found with mmap.find and every line is a memoryview
+    slice of the mapping, so lines are not copied before an order line is
+    decoded. A line is valid until the next one is read. "\n", "\r\n" and
+    "\r" line endings are accepted, the same way as by lexers of files
+    opened in text mode.
+    """
+
+    def __init__(self, path: str, line_limit: int = 1024, logger=logging.getLogger()):
+        self.path = path
+        super().__init__(None, line_limit=line_limit, logger=logger)
+
+    def _read_lines(self) -> Iterator[Line]:
+        with open(self.path, "rb") as file:
+            if not os.fstat(file.fileno()).st_size:
+                return
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                with memoryview(data) as view:
+                    yield from self.__split(data, view)
+
+    def __split(self, data: mmap.mmap, view: memoryview) -> Iterator[Line]:
+        start, size = 0, len(data)
+        # Positions of the next "\n" and "\r", searched again only after
+        # they are passed, so every byte is searched once per character
+        newline, carriage_return = data.find(b"\n"), data.find(b"\r")
+        while start < size:
+            if 0 <= newline < start:
+                newline = data.find(b"\n", start)
+            if 0 <= carriage_return < start:
+                carriage_return = data.find(b"\r", start)
+
+            stop = size
+            if 0 <= newline < stop:
+                stop = newline
+            if 0 <= carriage_return < stop:
+                stop = carriage_return
+            if stop == size:
+                ending, end = "", size
+            else:
+                ending, end = "\n", stop + 1
+                if stop == carriage_return and end == newline:
+                    end += 1
+
+            length = stop - start + len(ending)
+            if stop - start <= self.line_limit:
+                # The view is released once the next line is requested, so
+                # the mapping can be closed at the end of the file
+                with view[start:stop] as line:
+                    yield line, length, ending
+            else:
+                yield self.__cut_mapped(data, start, stop), length, ending
+            start = end
+
+    def __cut_mapped(self, data: mmap.mmap, start: int, stop: int) -> bytes:
+        """
+        Same as BulkInputLexer._cut without slicing the whole line.
+        """
+        line = data[start : start + self.line_limit + 1]
+        position = start + len(line)
+        while not line.lstrip(self.WHITESPACE) and position < stop:
+            # The line starts with a long run of whitespaces
+            chunk = data[position : min(position + self.line_limit, stop)]
+            line = line[:1] + chunk.lstrip(self.WHITESPACE)
+            position += len(chunk)
+        return self._cut(line)
@@ -0,0 +1,222 @@
+"""
+Write-ahead journal of accepted orders.
+
+The journal starts with the magic b"OBJN" and uint16 format version. Every
+entry is the uint64 book timestamp of the order, the order in the binary
+order format of orderbook.binary and the uint32 CRC32 of both, 27 bytes in
+total. Entries are written in groups and every group is synced to disk with
+one fsync, so an order is durable once the group of its entry is written,
+not when OrderBook.add returns. The application and the gateway hold back
+the transactions of an order until then, see `pending`, and sync the group
+themselves when no more orders arrive.
+"""
+import logging
+import os
+import struct
+import threading
+import time
+from typing import BinaryIO, Callable, Iterator, Optional, Tuple
+from zlib import crc32
+
+from orderbook import binary
+from orderbook.book import OrderBook
+from orderbook.order import Order
+
+MAGIC = b"OBJN"
+VERSION = 1
+HEADER = struct.Struct("<4sH")
+TIMESTAMP = struct.Struct("<Q")
+ENTRY = struct.Struct("<QcIHIII")
+# Size of the part of an entry covered by the CRC
+PAYLOAD_SIZE = ENTRY.size - 4
+
+
+def encode(timestamp: int, order: Order) -> bytes:
+    payload = TIMESTAMP.pack(timestamp) + binary.encode(order)
+    return payload + crc32(payload).to_bytes(4, "little")
+
+
+class Journal:
+    """
+    Appender of the journal, attached to a book with `book.journal`.
+
+    A group is written and synced when it has `group_size` entries or when
+    an entry is appended `max_delay` seconds after the first unsynced one.
+    Nothing is synced between appends, so whoever acknowledges orders calls
+    sync when the input is idle, and close does it before closing the file.
+    Sync may be called from another thread than append.
+    """
+
+    path: str
+    group_size: int
+    max_delay: float
+    __file: BinaryIO
+    __group: bytearray
+    __group_start: float
+
+    def __init__(
+        self,
+        path: str,
+        group_size: int = 1024,
+        max_delay: float = 0.01,
+        clock: Callable[[], float] = time.monotonic,
+        logger=logging.getLogger(),
+    ):
+        self.path = path
+        self.group_size = max(group_size, 1)
+        self.max_delay = max_delay
+        self.__clock = clock
+        self.__logger = logger
+        self.__file = open(path, "ab")
+        self.__group = bytearray()
+        self.__count = 0
+        self.__group_start = 0.0
+        self.__lock = threading.Lock()
+        if not self.__file.tell():
+            self.__file.write(HEADER.pack(MAGIC, VERSION))
+            self.sync()
+
+    def __enter__(self) -> "Journal":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def append(self, timestamp: int, order: Order) -> None:
+        with self.__lock:
+            if not self.__count:
+                self.__group_start = self.__clock()
+            self.__group += encode(timestamp, order)
+            self.__count += 1
+            if (
+                self.__count >= self.group_size
+                or self.__clock() - self.__group_start >= self.max_delay
+            ):
+                self.__write()
+
+    @property
+    def pending(self) -> int:
+        """
+        :return: Number of entries which are not on disk yet. Transactions of
+            their orders must not be acknowledged before they are synced
+        """
+        return self.__count
+
+    def sync(self) -> None:
+        """
+        Write the pending entries and wait until they are on disk.
+        """
+        with self.__lock:
+            self.__write()
+
+    def __write(self) -> None:
+        if self.__group:
+            self.__file.write(self.__group)
+            self.__group.clear()
+            self.__count = 0
+        self.__file.flush()
+        os.fsync(self.__file.fileno())
+
+    def checkpoint(self, book: OrderBook, snapshot_path: str) -> None:
+        """
+        Snapshot the book and empty the journal. Entries not older than the
+        snapshot are skipped by recover, so a crash between the two steps
+        loses nothing.
+        """
+        self.sync()
+        book.snapshot(snapshot_path)
+        self.__file.truncate(HEADER.size)
+        self.sync()
+        self.__logger.info("Checkpoint of timestamp %d", book.timestamp)
+
+    def close(self) -> None:
+        if not self.__file.closed:
+            self.sync()
+            self.__file.close()
+
+
+def read_journal(
+    path: str, logger=logging.getLogger(), start: int = 0, block_size: int = 4096
+) -> Iterator[Tuple[int, Order]]:
+    """
+    Entries have a fixed size, so reading may start at any of them without
+    reading the ones before it.
+
+    :param start: Number of entries to skip
+    :param block_size: Number of entries per read
+    :return: Generator of (timestamp, order) of the valid entries. Reading
+        stops at the first torn or corrupted entry, the rest of the journal
+        is what a crash left unsynced
+    """
+    with open(path, "rb") as file:
+        header = file.read(HEADER.size)
+        if len(header) < HEADER.size or HEADER.unpack(header) != (MAGIC, VERSION):
+            raise ValueError(f"Not an order journal: {path}")
+
+        position = HEADER.size + start * ENTRY.size
+        file.seek(position)
+        is_valid = True
+        while is_valid:
+            data = file.read(block_size * ENTRY.size)
+            view = memoryview(data)
+            offset = 0
+            for entry in ENTRY.iter_unpack(view[: len(data) - len(data) % ENTRY.size]):
+                if crc32(view[offset : offset + PAYLOAD_SIZE]) != entry[-1]:
+                    is_valid = False
+                    break
+                timestamp, direction, order_id, price, quantity, peak_size, _ = entry
+                yield timestamp, Order(
+                    direction == b"B", order_id, price, quantity, peak_size or None
+                )
+                offset += ENTRY.size
+            position += offset
+            if len(data) < block_size * ENTRY.size:
+                break
+
+        size = os.fstat(file.fileno()).st_size
+        if position < size:
+            logger.warning(
+                "Journal %s: %d bytes after entry %d are not valid",
+                path,
+                size - position,
+                (position - HEADER.size) // ENTRY.size,
+            )
+
+
+def recover(
+    snapshot_path: Optional[str], journal_path: str, logger=logging.getLogger()
+) -> OrderBook:
+    """
+    Restore the book from the snapshot, if there is one, and replay the
+    entries of the journal after it with their original timestamps. The
+    journal is cut after its last valid entry, so new entries follow it.
+    Orders are journaled before they are matched, so an order which failed
+    to match is journaled too: it is logged and skipped, and the rest of the
+    journal is replayed.
+
+    :return: Book without a journal
+    """
+    if snapshot_path is not None and os.path.exists(snapshot_path):
+        book = OrderBook.restore(snapshot_path, logger)
+    else:
+        book = OrderBook(logger)
+    if not os.path.exists(journal_path):
+        return book
+
+    end = HEADER.size
+    for timestamp, order in read_journal(journal_path, logger):
+        end += ENTRY.size
+        if timestamp > book.timestamp:
+            book.timestamp = timestamp - 1
+            try:
+                book.add(order)
+            except Exception:
+                logger.exception(
+                    "Journal %s: Failed to replay order %s of timestamp %d",
+                    journal_path,
+                    order,
+                    timestamp,
+                )
+    with open(journal_path, "r+b") as file:
+        file.truncate(end)
+    return book
@@ -0,0 +1,117 @@
+from collections import deque
+from itertools import chain
+from operator import attrgetter, neg
+from typing import Deque, Iterator, List, Optional, Tuple, Type
+
+from sortedcontainers import SortedDict
+
+from orderbook.book import OrderBook
+from orderbook.order import Order
+from orderbook.orderbookrecord import OrderBookRecord
+
+
+class PriceLadder:
+    """
+    One side of the book stored as a sorted index of price levels.
+
+    Every level is a FIFO queue of records with the same price, kept in
+    (timestamp, order_priority) order, so iterating the ladder yields records
+    in exactly the same order as a sorted side of OrderBook.
+    """
+
+    is_buy: bool
+    levels: SortedDict
+    __length: int
+
+    def __init__(self, is_buy: bool):
+        self.is_buy = is_buy
+        self.levels = SortedDict(neg) if is_buy else SortedDict()
+        self.__length = 0
+
+    def __len__(self) -> int:
+        return self.__length
+
+    def __iter__(self) -> Iterator[OrderBookRecord]:
+        return chain.from_iterable(self.levels.values())
+
+    def best(self) -> Optional[Tuple[int, Deque[OrderBookRecord]]]:
+        """
+        :return: (price, level) pair of the best level or None for an empty side
+        """
+        if not self.levels:
+            return None
+        return self.levels.peekitem(0)
+
+    def insert(self, order: Order, timestamp: int) -> OrderBookRecord:
+        """
+        :return: Handle of the new record, which is the record itself
+        """
+        record = OrderBookRecord(order, timestamp)
+        self.append(record)
+        return record
+
+    def append(self, record: OrderBookRecord) -> None:
+        level = self.levels.get(record.price)
+        if level is None:
+            level = self.levels[record.price] = deque()
+        level.append(record)
+        self.__length += 1
+
+    def load(self, records: List[OrderBookRecord]) -> List[OrderBookRecord]:
+        """
+        Add restored records, saved from the best to the worst, to an empty
+        side.
+
+        :return: Handles of the records in the same order
+        """
+        for record in records:
+            self.append(record)
+        return records
+
+    def settle(self, price: int, touched: int, timestamp: int) -> None:
+        """
+        Re-queue the first `touched` records of a level after a fill pass.
+        See requeue for details.
+        """
+        level: Deque[OrderBookRecord] = self.levels[price]
+        self.__length -= self.requeue(level, touched, timestamp)
+        if not level:
+            del self.levels[price]
+
+    @staticmethod
+    def requeue(level: Deque[OrderBookRecord], touched: int, timestamp: int) -> int:
+        """
+        Exhausted records are dropped. Records that kept their timestamp stay
+        at the head of the level, records stamped with `timestamp` move to the
+        back ordered by their order_priority. Untouched records keep their
+        places, so the cost depends only on the number of touched records.
+
+        :return: Number of dropped records
+        """
+        head = [level.popleft() for _ in range(touched)]
+        alive = [record for record in head if record.quantity]
+
+        level.extendleft(
+            reversed([record for record in alive if record.timestamp != timestamp])
+        )
+        level.extend(
+            sorted(
+                (record for record in alive if record.timestamp == timestamp),
+                key=attrgetter("order_priority"),
+            )
+        )
+        return touched - len(alive)
+
+
+class LadderOrderBook(OrderBook):
+    """
+    Order book engine built on price ladders.
+
+    Matching only visits the levels crossed by an incoming order, and a
+    replenished iceberg is moved to the back of its level's queue.
+    Transactions, logging and rendering are identical to OrderBook.
+    """
+
+    side_type: Type = PriceLadder
+    sell: PriceLadder  # type: ignore
+    buy: PriceLadder  # type: ignore
@@ -1,14 +1,20 @@
 import logging
-from typing import Optional
+import warnings
+from typing import Optional, Tuple
+
+MAX_ORDER_ID = 2 ** 31 - 1
+MAX_PRICE = 2 ** 15 - 1
+MAX_QUANTITY = 2 ** 31 - 1
 
 
 class Order:
+    __slots__ = ("is_buy", "order_id", "price", "quantity", "peak_size")
+
     is_buy: bool
     order_id: int
     price: int
     quantity: int
     peak_size: Optional[int]
-    __logger: logging.Logger
 
     def __init__(
         self,
@@ -17,14 +23,20 @@ class Order:
         price: int,
         quantity: int,
         peak_size: Optional[int] = None,
-        logger: logging.Logger = logging.getLogger(),
+        logger: Optional[logging.Logger] = None,
     ):
+        """
+        :param logger: Deprecated and ignored, orders don't log
+        """
         self.is_buy = is_buy
         self.order_id = order_id
         self.price = price
         self.quantity = quantity
         self.peak_size = peak_size
-        self.__logger = logger
+        if logger is not None:
+            warnings.warn(
+                "The logger argument of Order is ignored", DeprecationWarning, 2
+            )
 
     def __repr__(self):
         return ",".join(
@@ -43,6 +55,17 @@ class Order:
     def __str__(self):
         return repr(self)
 
+    def copy(self) -> "Order":
+        """
+        Shallow copy of the order. OrderBook mutates the quantity of its own
+        working copy, so caller's orders are never changed.
+
+        :return: Order object with the same fields
+        """
+        return Order(
+            self.is_buy, self.order_id, self.price, self.quantity, self.peak_size
+        )
+
     @classmethod
     def create(
         cls,
@@ -50,49 +73,72 @@ class Order:
         order_id: int = None,
         price: int = None,
         quantity: int = None,
-        peak_size: int = None,
+        peak_size: Optional[int] = None,
         logger=logging.getLogger(),
     ):
+        # Fast path for valid input: plain comparisons and no allocations
+        if (
+            is_buy.__class__ is bool
+            and order_id.__class__ is int
+            and 0 < order_id <= MAX_ORDER_ID
+            and price.__class__ is int
+            and 0 < price <= MAX_PRICE
+            and quantity.__class__ is int
+            and 0 < quantity <= MAX_QUANTITY
+            and (
+                peak_size is None
+                or peak_size.__class__ is int
+                and 0 < peak_size <= MAX_QUANTITY
+            )
+        ):
+            return cls(is_buy, order_id, price, quantity, peak_size)
 
         ok = True
 
         if is_buy and not isinstance(is_buy, bool):
-            logger.error(f"Unexpected is_buy: {is_buy}")
+            logger.error("Unexpected is_buy: %s", is_buy)
             ok = False
 
-        def check_int(value, name, min, max):
-            if value is None:
-                return None, True
-            if not isinstance(value, int):
-                logger.error(f"Unexpected type {name}: {value}")
-                return None, False
-            if value <= min or value > max:
-                logger.error(f"Unexpected {name}: {value}")
-                return None, False
-            return value, True
-
-        order_id, tmp_ok = check_int(order_id, "order_id", 0, 2 ** 31 - 1)
+        valid_id, tmp_ok = cls.__check_int(order_id, "order_id", MAX_ORDER_ID, logger)
         ok = ok and tmp_ok
 
-        price, tmp_ok = check_int(price, "price", 0, 2 ** 15 - 1)
+        valid_price, tmp_ok = cls.__check_int(price, "price", MAX_PRICE, logger)
         ok = ok and tmp_ok
 
-        quantity, tmp_ok = check_int(quantity, "quantity", 0, 2 ** 31 - 1)
+        valid_quantity, tmp_ok = cls.__check_int(
+            quantity, "quantity", MAX_QUANTITY, logger
+        )
         ok = ok and tmp_ok
 
-        peak_size, tmp_ok = check_int(peak_size, "peak_size", 0, 2 ** 31 - 1)
+        valid_peak_size, tmp_ok = cls.__check_int(
+            peak_size, "peak_size", MAX_QUANTITY, logger
+        )
         ok = ok and tmp_ok
 
         if (
             not ok
             or is_buy is None
-            or order_id is None
-            or price is None
-            or quantity is None
+            or valid_id is None
+            or valid_price is None
+            or valid_quantity is None
         ):
             return None
 
-        return cls(is_buy, order_id, price, quantity, peak_size, logger)
+        return cls(is_buy, valid_id, valid_price, valid_quantity, valid_peak_size)
+
+    @staticmethod
+    def __check_int(
+        value, name: str, max: int, logger: logging.Logger
+    ) -> Tuple[Optional[int], bool]:
+        if value is None:
+            return None, True
+        if not isinstance(value, int):
+            logger.error("Unexpected type %s: %s", name, value)
+            return None, False
+        if value <= 0 or value > max:
+            logger.error("Unexpected %s: %s", name, value)
+            return None, False
+        return value, True
 
     @classmethod
     def from_string(cls, data: str, logger=logging.getLogger()):
@@ -102,22 +148,22 @@ class Order:
         :return: Order object
         """
         if not isinstance(data, str):
-            logger.error(f"Expected str, got {data}")
+            logger.error("Expected str, got %s", data)
             return None
 
         if len(data) > 40:
-            logger.error(f"Input string is too long: {len(data)}")
+            logger.error("Input string is too long: %d", len(data))
             return None
 
         tokens = data.split(",")
         if len(tokens) < 4 or len(tokens) > 5:
-            logger.error(f"Expected from 4 to 5 comma-separated values: {len(tokens)}")
+            logger.error("Expected from 4 to 5 comma-separated values: %d", len(tokens))
             return None
 
         direction, order_id_str, price_str, quantity_str, *peak_size_list = tokens
 
         if direction not in ["B", "S"]:
-            logger.error(f"Unexpected buy direction: {direction}")
+            logger.error("Unexpected buy direction: %s", direction)
             return None
 
         is_buy = direction == "B"
@@ -1,7 +1,21 @@
+from typing import Tuple
+
 from orderbook.order import Order
 
 
 class OrderBookRecord:
+    __slots__ = (
+        "is_buy",
+        "order_id",
+        "max_peak_size",
+        "current_peak_size",
+        "price",
+        "quantity",
+        "timestamp",
+        "order_priority",
+        "sort_key",
+    )
+
     is_buy: bool
     order_id: int
     max_peak_size: int
@@ -10,37 +24,74 @@ class OrderBookRecord:
     quantity: int
     timestamp: int
     order_priority: int
+    sort_key: Tuple[int, int, int]
 
     def __init__(self, order: Order, timestamp: int, order_priority: int = 0):
         self.order_id = order.order_id
+        # What is left of an aggressive iceberg may be less than its peak
         self.max_peak_size = (
-            order.peak_size if order.peak_size is not None else order.quantity
+            min(order.peak_size, order.quantity)
+            if order.peak_size is not None
+            else order.quantity
         )
         self.current_peak_size = self.max_peak_size
         self.price = order.price
         self.quantity = order.quantity
         self.is_buy = order.is_buy
-        self.timestamp = timestamp
-        self.order_priority = order_priority
+        self.requeue(timestamp, order_priority)
         assert self.max_peak_size == self.current_peak_size
         assert self.quantity >= self.max_peak_size
 
+    @classmethod
+    def restore(
+        cls,
+        is_buy: bool,
+        order_id: int,
+        price: int,
+        quantity: int,
+        max_peak_size: int,
+        current_peak_size: int,
+        timestamp: int,
+        order_priority: int,
+    ) -> "OrderBookRecord":
+        """
+        Create a record in a saved state, which the constructor can't do for
+        a partially filled iceberg.
+        """
+        record = cls.__new__(cls)
+        record.is_buy = is_buy
+        record.order_id = order_id
+        record.price = price
+        record.quantity = quantity
+        record.max_peak_size = max_peak_size
+        record.current_peak_size = current_peak_size
+        record.requeue(timestamp, order_priority)
+        return record
+
+    def requeue(self, timestamp: int, order_priority: int) -> None:
+        """
+        Set timestamp and order_priority and refresh the sort key.
+
+        The sort key orders records of one side from the best to the worst:
+        by price (descending for buy orders), then by timestamp and priority.
+        """
+        self.timestamp = timestamp
+        self.order_priority = order_priority
+        self.sort_key = (
+            -self.price if self.is_buy else self.price,
+            timestamp,
+            order_priority,
+        )
+
     def __lt__(self, other):
         if self.is_buy != other.is_buy:
             raise ValueError("Only Orders with the same is_buy value are comparable.")
 
-        if self.price == other.price:
-            if self.timestamp == other.timestamp:
-                if self.order_priority == other.order_priority:
-                    raise ValueError(
-                        "Orders with same price and date cannot have equal priority."
-                    )
-                return self.order_priority < other.order_priority
-            return self.timestamp < other.timestamp
-
-        if self.is_buy is True:
-            return self.price > other.price
-        return self.price < other.price
+        if self.sort_key == other.sort_key:
+            raise ValueError(
+                "Orders with same price and date cannot have equal priority."
+            )
+        return self.sort_key < other.sort_key
 
     def __repr__(self):
         return (
@@ -0,0 +1,141 @@
+from collections import deque
+from typing import Deque, Iterator, List, Optional, Tuple
+
+from orderbook.ladder import LadderOrderBook, PriceLadder
+from orderbook.order import MAX_PRICE, Order
+from orderbook.orderbookrecord import OrderBookRecord
+
+
+class PriceArray:
+    """
+    One side of the book stored as a direct-indexed array of price levels.
+
+    Order.create limits prices to 15 bits, so every possible price has its own
+    slot. Occupied prices are tracked by a two-level bitmap: a 64-bit word per
+    64 prices and a summary with a bit per non-empty word. Finding the best
+    level or the next non-empty one takes a couple of bit operations.
+    """
+
+    is_buy: bool
+    levels: List[Optional[Deque[OrderBookRecord]]]
+    __words: List[int]
+    __summary: int
+    __length: int
+
+    def __init__(self, is_buy: bool):
+        self.is_buy = is_buy
+        self.levels = [None] * (MAX_PRICE + 1)
+        self.__words = [0] * ((MAX_PRICE >> 6) + 1)
+        self.__summary = 0
+        self.__length = 0
+
+    def __len__(self) -> int:
+        return self.__length
+
+    def __iter__(self) -> Iterator[OrderBookRecord]:
+        price = self.__best_price()
+        while price is not None:
+            yield from self.levels[price]  # type: ignore
+            if self.is_buy:
+                price = self.__highest(price - 1)
+            else:
+                price = self.__lowest(price + 1)
+
+    def best(self) -> Optional[Tuple[int, Deque[OrderBookRecord]]]:
+        """
+        :return: (price, level) pair of the best level or None for an empty side
+        """
+        price = self.__best_price()
+        if price is None:
+            return None
+        return price, self.levels[price]  # type: ignore
+
+    def insert(self, order: Order, timestamp: int) -> OrderBookRecord:
+        """
+        :return: Handle of the new record, which is the record itself
+        """
+        record = OrderBookRecord(order, timestamp)
+        self.append(record)
+        return record
+
+    def append(self, record: OrderBookRecord) -> None:
+        price = record.price
+        if not 0 < price <= MAX_PRICE:
+            raise ValueError(f"Price is out of range: {price}")
+        level = self.levels[price]
+        if level is None:
+            level = self.levels[price] = deque()
+            self.__words[price >> 6] |= 1 << (price & 63)
+            self.__summary |= 1 << (price >> 6)
+        level.append(record)
+        self.__length += 1
+
+    def load(self, records: List[OrderBookRecord]) -> List[OrderBookRecord]:
+        """
+        Same as PriceLadder.load.
+
+        :return: Handles of the records in the same order
+        """
+        for record in records:
+            self.append(record)
+        return records
+
+    def settle(self, price: int, touched: int, timestamp: int) -> None:
+        """
+        Re-queue the first `touched` records of a level after a fill pass.
+        See PriceLadder.requeue for details.
+        """
+        level: Deque[OrderBookRecord] = self.levels[price]  # type: ignore
+        self.__length -= PriceLadder.requeue(level, touched, timestamp)
+        if not level:
+            self.levels[price] = None
+            word = self.__words[price >> 6] & ~(1 << (price & 63))
+            self.__words[price >> 6] = word
+            if not word:
+                self.__summary &= ~(1 << (price >> 6))
+
+    def __best_price(self) -> Optional[int]:
+        if self.is_buy:
+            return self.__highest(MAX_PRICE)
+        return self.__lowest(0)
+
+    def __lowest(self, price: int) -> Optional[int]:
+        """
+        :return: The lowest occupied price not less than `price` or None
+        """
+        index = price >> 6
+        if index < len(self.__words):
+            word = self.__words[index] & (-1 << (price & 63))
+            if word:
+                return (index << 6) + (word & -word).bit_length() - 1
+
+        summary = self.__summary & (-1 << (index + 1))
+        if not summary:
+            return None
+        index = (summary & -summary).bit_length() - 1
+        word = self.__words[index]
+        return (index << 6) + (word & -word).bit_length() - 1
+
+    def __highest(self, price: int) -> Optional[int]:
+        """
+        :return: The highest occupied price not greater than `price` or None
+        """
+        index = price >> 6
+        word = self.__words[index] & ((2 << (price & 63)) - 1)
+        if word:
+            return (index << 6) + word.bit_length() - 1
+
+        summary = self.__summary & ((1 << index) - 1)
+        if not summary:
+            return None
+        index = summary.bit_length() - 1
+        return (index << 6) + self.__words[index].bit_length() - 1
+
+
+class ArrayOrderBook(LadderOrderBook):
+    """
+    LadderOrderBook with sides stored in PriceArray. Best price lookups and
+    sweeps across levels avoid tree operations completely.
+    """
+
+    side_type = PriceArray
@@ -0,0 +1,187 @@
+"""
+Books of many instruments in one process.
+"""
+import os
+import pickle
+import tempfile
+import time
+from collections import OrderedDict
+from logging import getLogger
+from typing import Callable, Dict, List, Optional
+from urllib.parse import quote
+
+from orderbook.book import OrderBook
+from orderbook.order import Order
+from orderbook.transaction import Transaction
+
+
+class BookRegistry:
+    """
+    OrderBook per instrument, created on the first order of the instrument.
+
+    Resident books are kept in least recently used order. A book is evicted
+    to a file in `directory` when it has been idle for more than `max_idle`
+    seconds, and the least recently used books are evicted while the
+    estimated memory of resident books is above `memory_limit` bytes. An
+    evicted book is loaded back on its next use, with the same records and
+    timestamp, so matching is the same as if it had never left memory.
+
+    Files of evicted books are removed when they are loaded back and when
+    the registry is closed, together with the temporary directory the
+    registry created for them.
+    """
+
+    # Estimates of the memory of an empty book and of every resting record
+    BOOK_SIZE = 1200
+    RECORD_SIZE = 350
+
+    max_idle: Optional[float]
+    memory_limit: Optional[int]
+    __books: "OrderedDict[str, OrderBook]"
+    __last_used: Dict[str, float]
+    __sizes: Dict[str, int]
+    __evicted: Dict[str, str]
+    __temporary: Optional[tempfile.TemporaryDirectory]
+
+    def __init__(
+        self,
+        directory: Optional[str] = None,
+        max_idle: Optional[float] = None,
+        memory_limit: Optional[int] = None,
+        clock: Callable[[], float] = time.monotonic,
+        logger=getLogger(),
+    ):
+        """
+        :param directory: Directory of evicted books. A temporary directory,
+            removed on close, is created on the first eviction if it is not set
+        :param clock: Source of time for max_idle
+        """
+        self.directory = directory
+        self.max_idle = max_idle
+        self.memory_limit = memory_limit
+        self.__clock = clock
+        self.__logger = logger
+        self.__books = OrderedDict()
+        self.__last_used = dict()
+        self.__sizes = dict()
+        self.__evicted = dict()
+        self.__temporary = None
+        self.__memory = 0
+
+    def __enter__(self) -> "BookRegistry":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """
+        Drop evicted books with their files. Resident books stay usable.
+        """
+        for path in self.__evicted.values():
+            os.remove(path)
+        self.__evicted.clear()
+        if self.__temporary is not None:
+            self.__temporary.cleanup()
+            self.__temporary = None
+            self.directory = None
+
+    def __contains__(self, symbol: str) -> bool:
+        return symbol in self.__books or symbol in self.__evicted
+
+    def __len__(self) -> int:
+        return len(self.__books) + len(self.__evicted)
+
+    @property
+    def resident(self) -> List[str]:
+        """
+        :return: Symbols of books in memory from the least recently used
+        """
+        return list(self.__books)
+
+    @property
+    def memory(self) -> int:
+        """
+        :return: Estimated memory of resident books
+        """
+        return self.__memory
+
+    def get(self, symbol: str) -> OrderBook:
+        """
+        :return: Book of the instrument, loaded or created if it is not in
+            memory. Eviction doesn't change the book, but records found in
+            it are not live after it is evicted
+        """
+        book = self.__books.get(symbol)
+        if book is None:
+            book = self.__books[symbol] = self.__load(symbol)
+            self.__sizes[symbol] = 0
+            self.__resize(symbol, book)
+        else:
+            self.__books.move_to_end(symbol)
+        if self.max_idle is not None:
+            self.__last_used[symbol] = self.__clock()
+        return book
+
+    def add(self, symbol: str, order: Order) -> List[Transaction]:
+        book = self.get(symbol)
+        transactions = book.add(order)
+        self.__resize(symbol, book)
+        self.evict_idle(keep=symbol)
+        return transactions
+
+    def evict_idle(self, keep: Optional[str] = None) -> None:
+        """
+        Evict books over the idle time and the memory limit.
+
+        :param keep: Symbol of a book which stays in memory anyway
+        """
+        # Books are checked from the least recently used, and the kept book,
+        # just used, is the most recently used one
+        if self.max_idle is not None:
+            deadline = self.__clock() - self.max_idle
+            while self.__books:
+                symbol = next(iter(self.__books))
+                if symbol == keep or self.__last_used[symbol] >= deadline:
+                    break
+                self.evict(symbol)
+
+        if self.memory_limit is not None:
+            while self.__memory > self.memory_limit:
+                symbol = next(iter(self.__books))
+                if symbol == keep:
+                    break
+                self.evict(symbol)
+
+    def evict(self, symbol: str) -> None:
+        """
+        Write the book to disk and drop it from memory.
+        """
+        book = self.__books.pop(symbol)
+        self.__memory -= self.__sizes.pop(symbol)
+        self.__last_used.pop(symbol, None)
+
+        if self.directory is None:
+            self.__temporary = tempfile.TemporaryDirectory(prefix="orderbook-")
+            self.directory = self.__temporary.name
+        path = os.path.join(self.directory, quote(symbol, safe="") + ".book")
+        with open(path, "wb") as file:
+            pickle.dump(book, file, pickle.HIGHEST_PROTOCOL)
+        self.__evicted[symbol] = path
+        self.__logger.info("Book %s evicted to %s", symbol, path)
+
+    def __resize(self, symbol: str, book: OrderBook) -> None:
+        size = self.BOOK_SIZE + self.RECORD_SIZE * (len(book.buy) + len(book.sell))
+        self.__memory += size - self.__sizes[symbol]
+        self.__sizes[symbol] = size
+
+    def __load(self, symbol: str) -> OrderBook:
+        path = self.__evicted.pop(symbol, None)
+        if path is None:
+            return OrderBook(self.__logger)
+
+        with open(path, "rb") as file:
+            book = pickle.load(file)
+        os.remove(path)
+        self.__logger.info("Book %s loaded from %s", symbol, path)
+        return book
@@ -0,0 +1,234 @@
+"""
+Matching of many instruments across worker processes.
+
+Order lines carry the instrument in front of the order: `SYMBOL,B,1,10,20`.
+The router hashes every symbol to one of the workers, so all orders of an
+instrument are matched by the same process in input order, and every worker
+owns the books of its instruments. Lines go to the workers in batches and
+their transactions come back tagged with the line number, so the merged
+output follows the input order. Transactions are written as
+`SYMBOL,buy_id,sell_id,price,quantity` lines.
+
+Workers send their log records to the router through a queue, and the
+router passes them to its own logger, so they end up wherever the logs of
+the router go.
+"""
+import logging
+import multiprocessing
+import os
+import queue
+from heapq import merge
+from itertools import islice
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Callable, Iterator, List, Optional, Tuple
+from zlib import crc32
+
+from orderbook.inputparser import BulkInputLexer
+from orderbook.order import Order
+from orderbook.registry import BookRegistry
+
+# line number, symbol, order
+Line = Tuple[int, str, str]
+# line number, transactions of the line
+Result = Tuple[int, str]
+
+
+def match_batches(
+    inbox,
+    outbox,
+    registry_factory: Callable[..., BookRegistry] = BookRegistry,
+    logger=logging.getLogger(),
+    log_queue=None,
+    level: Optional[int] = None,
+) -> None:
+    """
+    Worker loop: match batches of lines from the inbox until None and put the
+    transactions of every batch to the outbox.
+
+    :param inbox: Queue of lists of Line
+    :param outbox: Queue of lists of Result, sorted by line number
+    :param registry_factory: Creates the registry of the books of the worker
+        from a logger
+    :param log_queue: Queue of the router which replaces the handlers of the
+        logger, which a forked worker inherits but nothing reads
+    :param level: Level of the logger in the worker
+    """
+    if log_queue is not None:
+        logger.handlers = [QueueHandler(log_queue)]
+        logger.propagate = False
+    if level is not None:
+        logger.setLevel(level)
+
+    with registry_factory(logger=logger) as registry:
+        for batch in iter(inbox.get, None):
+            results: List[Result] = []
+            for line_count, symbol, line in batch:
+                order = Order.from_string(line, logger)
+                if order is None:
+                    logger.error(
+                        "Line %d: Failed to parse order %s,%s", line_count, symbol, line
+                    )
+                    continue
+
+                transactions = registry.add(symbol, order)
+                if transactions:
+                    text = "".join(
+                        f"{symbol},{transaction}\n" for transaction in transactions
+                    )
+                    results.append((line_count, text))
+            outbox.put(results)
+
+
+class LoggerHandler(logging.Handler):
+    """
+    Handler which passes records to a logger, e.g. records of the workers to
+    the logger of the router.
+    """
+
+    def __init__(self, logger: logging.Logger):
+        super().__init__()
+        self.logger = logger
+
+    def emit(self, record: logging.LogRecord) -> None:
+        self.logger.handle(record)
+
+
+class ShardedMatcher:
+    """
+    Router of order lines to worker processes.
+
+    A batch is sent to every worker before the results of the previous one
+    are collected, so the router reads and splits lines while the workers
+    match. A worker which exits stops the run with RuntimeError instead of
+    leaving the router waiting for its results.
+    """
+
+    workers: int
+    batch_size: int
+    __processes: List[Any]
+    __inboxes: List[Any]
+    __outboxes: List[Any]
+    __log_listener: Optional[QueueListener]
+
+    def __init__(
+        self,
+        workers: Optional[int] = None,
+        batch_size: int = 4096,
+        registry_factory: Callable[..., BookRegistry] = BookRegistry,
+        logger=logging.getLogger(),
+    ):
+        """
+        :param registry_factory: Same as of match_batches, e.g. a partial of
+            BookRegistry with eviction options. Every worker has its own
+            registry and evicts its own books
+        """
+        self.workers = max(workers or os.cpu_count() or 1, 1)
+        self.batch_size = max(batch_size, 1)
+        self.__registry_factory = registry_factory
+        self.__logger = logger
+        self.__processes = []
+        self.__inboxes = []
+        self.__outboxes = []
+        self.__log_listener = None
+
+    def __enter__(self) -> "ShardedMatcher":
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def start(self) -> None:
+        log_queue: Any = multiprocessing.Queue()
+        self.__log_listener = QueueListener(log_queue, LoggerHandler(self.__logger))
+        self.__log_listener.start()
+        for index in range(self.workers):
+            self.__inboxes.append(multiprocessing.Queue())
+            self.__outboxes.append(multiprocessing.Queue())
+            process = multiprocessing.Process(
+                target=match_batches,
+                args=(
+                    self.__inboxes[index],
+                    self.__outboxes[index],
+                    self.__registry_factory,
+                    self.__logger,
+                    log_queue,
+                    self.__logger.getEffectiveLevel(),
+                ),
+                daemon=True,
+            )
+            process.start()
+            self.__processes.append(process)
+
+    def close(self) -> None:
+        for inbox, process in zip(self.__inboxes, self.__processes):
+            if process.is_alive():
+                inbox.put(None)
+        for process in self.__processes:
+            process.join()
+        # Records of the workers are queued before they exit
+        if self.__log_listener is not None:
+            self.__log_listener.stop()
+            self.__log_listener = None
+        self.__processes.clear()
+        self.__inboxes.clear()
+        self.__outboxes.clear()
+
+    def worker_of(self, symbol: str) -> int:
+        """
+        Stable across runs, unlike hash of str.
+        """
+        return crc32(symbol.encode()) % self.workers
+
+    def run(self, lexer: BulkInputLexer) -> Iterator[str]:
+        """
+        :param lexer: Source of lines, its orders are not parsed by the lexer
+        :return: Generator of tagged transactions, one chunk per batch
+        """
+        lines = self.__split(lexer)
+        in_flight = 0
+        while True:
+            batches: List[List[Line]] = [[] for _ in range(self.workers)]
+            count = 0
+            for line_count, symbol, data in islice(lines, self.batch_size):
+                batches[self.worker_of(symbol)].append((line_count, symbol, data))
+                count += 1
+            if count:
+                for inbox, batch in zip(self.__inboxes, batches):
+                    inbox.put(batch)
+                in_flight += 1
+            if in_flight > 1 or (in_flight and not count):
+                yield self.__collect()
+                in_flight -= 1
+            if not count and not in_flight:
+                return
+
+    def __collect(self) -> str:
+        results = []
+        for index, outbox in enumerate(self.__outboxes):
+            while True:
+                try:
+                    results.append(outbox.get(timeout=1))
+                    break
+                except queue.Empty:
+                    process = self.__processes[index]
+                    if not process.is_alive():
+                        raise RuntimeError(
+                            f"Worker {index} exited with code {process.exitcode}"
+                        )
+        return "".join(text for _, text in merge(*results))
+
+    def __split(self, lexer: BulkInputLexer) -> Iterator[Line]:
+        """
+        Split the symbol from the order of every order line of the lexer.
+        """
+        for line_count, line in lexer.lines():
+            symbol, comma, order = line.partition(",")
+            if not comma or symbol.split() != [symbol]:
+                self.__logger.error(
+                    "Line %d: Failed to parse instrument of %s",
+                    line_count,
+                    line.rstrip("\n"),
+                )
+                continue
+            yield line_count, symbol, order
@@ -0,0 +1,61 @@
+"""
+Binary snapshot format of OrderBook.
+
+A snapshot is a header followed by fixed-width little-endian records of the
+buy side and then of the sell side, every side from the best record to the
+worst. The header is the magic b"OBSN", uint16 format version, uint64 book
+timestamp and uint32 record counts of the buy and the sell side. A record is
+uint32 id, uint16 price, uint32 quantity, uint32 max peak size, uint32
+current peak size, uint64 timestamp and uint32 order priority.
+"""
+import struct
+from itertools import chain
+from typing import Collection, List, Tuple
+
+from orderbook.orderbookrecord import OrderBookRecord
+
+MAGIC = b"OBSN"
+VERSION = 1
+HEADER = struct.Struct("<4sHQII")
+RECORD = struct.Struct("<IHIIIQI")
+
+
+def encode(
+    timestamp: int, buy: Collection[OrderBookRecord], sell: Collection[OrderBookRecord]
+) -> bytes:
+    """
+    :param buy: Buy records from the best to the worst
+    :param sell: Sell records from the best to the worst
+    """
+    pack = RECORD.pack
+    return HEADER.pack(MAGIC, VERSION, timestamp, len(buy), len(sell)) + b"".join(
+        pack(
+            record.order_id,
+            record.price,
+            record.quantity,
+            record.max_peak_size,
+            record.current_peak_size,
+            record.timestamp,
+            record.order_priority,
+        )
+        for record in chain(buy, sell)
+    )
+
+
+def decode(data: bytes) -> Tuple[int, List[OrderBookRecord], List[OrderBookRecord]]:
+    """
+    :return: Book timestamp, buy records and sell records in the saved order
+    """
+    if len(data) < HEADER.size:
+        raise ValueError("Snapshot is truncated")
+    magic, version, timestamp, buy_count, sell_count = HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"Unknown snapshot format: {magic!r} version {version}")
+    if len(data) != HEADER.size + RECORD.size * (buy_count + sell_count):
+        raise ValueError("Snapshot size doesn't match its record counts")
+
+    restore = OrderBookRecord.restore
+    fields = RECORD.iter_unpack(memoryview(data)[HEADER.size :])
+    buy = [restore(True, *row) for _, row in zip(range(buy_count), fields)]
+    sell = [restore(False, *row) for row in fields]
+    return timestamp, buy, sell
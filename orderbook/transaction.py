@@ -1,4 +1,6 @@
 class Transaction:
+    __slots__ = ("buy_id", "sell_id", "price", "quantity")
+
     buy_id: int
     sell_id: int
     price: int
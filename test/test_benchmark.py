@@ -0,0 +1,73 @@
+import json
+import random
+from io import StringIO
+
+import mock
+
+from orderbook import benchmark
+from orderbook.benchmark import SCENARIOS, Scenario, percentile, run
+from orderbook.book import OrderBook
+
+
+def test_percentile() -> None:
+    samples = list(range(1, 1001))
+    assert percentile(samples, 0.5) == 500
+    assert percentile(samples, 0.99) == 990
+    assert percentile(samples, 0.999) == 999
+    assert percentile([7], 0.999) == percentile([7], 0) == 7
+
+
+def test_run_engines() -> None:
+    for engine in benchmark.ENGINES:
+        results = run(list(SCENARIOS), engine, size=30, depth=50)
+        assert results["engine"] == engine
+        assert list(results["results"]) == list(SCENARIOS)
+        for result in results["results"].values():
+            assert result["operations"] == 30
+            assert result["throughput"] > 0
+            assert 0 < result["p50_us"] <= result["p99_us"] <= result["p99.9_us"]
+
+
+def test_scenarios_keep_books_steady() -> None:
+    for name in ["add_aggressive", "add_iceberg"]:
+        scenario = Scenario(OrderBook, 20, 10, random.Random(0))
+        transactions: list = [operation() for operation in SCENARIOS[name](scenario)]
+        assert all(transactions)
+        assert sum(t.quantity for t in transactions[-1]) == (
+            100 if name == "add_aggressive" else 500
+        )
+
+
+def test_main(tmp_path) -> None:
+    path = str(tmp_path / "results.json")
+    args = ["--scenario", "from_string", "--scenario", "render", "--size", "20"]
+    with mock.patch("sys.stdout", new=StringIO()) as output:
+        benchmark.main([*args, "--output", path])
+        lines = output.getvalue().splitlines()
+    assert lines[0].split() == [
+        "scenario",
+        "ops/s",
+        "p50",
+        "us",
+        "p99",
+        "us",
+        "p99.9",
+        "us",
+    ]
+    assert [line.split()[0] for line in lines[1:]] == ["from_string", "render"]
+
+    with open(path) as file:
+        results = json.load(file)
+    assert results["size"] == 20 and list(results["results"]) == [
+        "from_string",
+        "render",
+    ]
+
+    results["results"]["render"]["p99_us"] = 0
+    with open(path, "w") as file:
+        json.dump(results, file)
+    with mock.patch("sys.stdout", new=StringIO()) as output:
+        benchmark.main([*args, "--compare", path, "--size", "0"])
+        lines = output.getvalue().splitlines()
+    assert len(lines[1].split()) == 9 and lines[1].split()[5].endswith("%")
+    assert lines[2].split()[7] == "n/a"
@@ -0,0 +1,133 @@
+import io
+import logging
+from io import StringIO
+
+import mock
+
+from orderbook import application
+from orderbook.binary import RECORD, BinaryOrderReader, convert, encode, main
+from orderbook.order import Order
+
+
+class ChunkedStream(io.BytesIO):
+    """
+    Stream returning at most `chunk` bytes per read like a pipe does.
+    """
+
+    def __init__(self, data: bytes, chunk: int):
+        super().__init__(data)
+        self.chunk = chunk
+
+    def readinto(self, buffer) -> int:  # type: ignore
+        return super().readinto(memoryview(buffer)[: self.chunk])
+
+
+def test_encode() -> None:
+    assert encode(Order(True, 1, 2, 3)) == b"B\x01\0\0\0\x02\0\x03\0\0\0\0\0\0\0"
+    assert encode(Order(False, 2 ** 31 - 1, 2 ** 15 - 1, 7, 5))[-4:] == b"\x05\0\0\0"
+    assert RECORD.size == 15
+
+
+def test_reader_round_trip(caplog) -> None:
+    caplog.set_level(logging.INFO)
+    orders = [
+        Order(i % 2 == 0, i, 100 + i % 7, 10 * i, i % 3 or None) for i in range(1, 50)
+    ]
+    data = b"".join(map(encode, orders))
+
+    for block_size in (0, 1, 4, 100):
+        for chunk in (1, 7, 15, 1000):
+            caplog.clear()
+            reader = BinaryOrderReader(ChunkedStream(data, chunk), block_size)
+            assert iter(reader) is reader
+            assert list(map(repr, reader)) == list(map(repr, orders))
+            assert reader.get() is None
+            assert caplog.record_tuples[-1] == ("root", 20, "Record 49: S,49,100,490,1")
+            assert len(caplog.record_tuples) == 49
+
+
+def test_reader_validation(caplog) -> None:
+    records = [
+        RECORD.pack(b"B", 1, 10, 5, 0),
+        RECORD.pack(b"X", 2, 10, 5, 0),
+        RECORD.pack(b"S", 3, 2 ** 15, 5, 0),
+        RECORD.pack(b"S", 0, 10, 5, 0),
+        RECORD.pack(b"S", 2 ** 31, 10, 5, 0),
+        RECORD.pack(b"S", 4, 0, 5, 0),
+        RECORD.pack(b"S", 5, 10, 0, 0),
+        RECORD.pack(b"S", 6, 10, 2 ** 31, 0),
+        RECORD.pack(b"S", 7, 10, 5, 2 ** 31),
+        RECORD.pack(b"S", 8, 10, 5, 2),
+    ]
+    reader = BinaryOrderReader(io.BytesIO(b"".join(records) + b"B\x01"))
+    assert list(map(repr, reader)) == ["B,1,10,5,None", "S,8,10,5,2"]
+    assert caplog.record_tuples == [
+        ("root", 40, "Unexpected buy direction: b'X'"),
+        ("root", 40, "Record 2: Failed to decode order (b'X', 2, 10, 5, 0)"),
+        ("root", 40, "Unexpected price: 32768"),
+        ("root", 40, "Record 3: Failed to decode order (b'S', 3, 32768, 5, 0)"),
+        ("root", 40, "Unexpected order_id: 0"),
+        ("root", 40, "Record 4: Failed to decode order (b'S', 0, 10, 5, 0)"),
+        ("root", 40, "Unexpected order_id: 2147483648"),
+        ("root", 40, "Record 5: Failed to decode order (b'S', 2147483648, 10, 5, 0)"),
+        ("root", 40, "Unexpected price: 0"),
+        ("root", 40, "Record 6: Failed to decode order (b'S', 4, 0, 5, 0)"),
+        ("root", 40, "Unexpected quantity: 0"),
+        ("root", 40, "Record 7: Failed to decode order (b'S', 5, 10, 0, 0)"),
+        ("root", 40, "Unexpected quantity: 2147483648"),
+        ("root", 40, "Record 8: Failed to decode order (b'S', 6, 10, 2147483648, 0)"),
+        ("root", 40, "Unexpected peak_size: 2147483648"),
+        ("root", 40, "Record 9: Failed to decode order (b'S', 7, 10, 5, 2147483648)"),
+        ("root", 40, "Truncated record at the end of input: 2 bytes"),
+    ]
+
+
+def test_convert(caplog, tmp_path) -> None:
+    text = "B,1,10,20,1\n # comment\nX,2,9,20\nS,3,9,22\n"
+    output = io.BytesIO()
+    assert convert(StringIO(text), output, batch_size=1) == 2
+    assert output.getvalue() == encode(Order(True, 1, 10, 20, 1)) + encode(
+        Order(False, 3, 9, 22)
+    )
+
+    text_path, binary_path = tmp_path / "orders.txt", tmp_path / "orders.bin"
+    text_path.write_text(text)
+    main([str(text_path), str(binary_path)])
+    assert binary_path.read_bytes() == output.getvalue()
+
+    with mock.patch("sys.stdin", new=StringIO(text)):
+        with mock.patch("sys.stdout", new=StringIO()) as output_data:
+            application.start([])
+            expected = output_data.getvalue()
+
+    with mock.patch("sys.stdout", new=StringIO()) as output_data:
+        application.start(["--binary", "--input", str(binary_path)])
+        assert output_data.getvalue() == expected
+
+    stdin = mock.Mock(buffer=io.BytesIO(output.getvalue()))
+    with mock.patch("sys.stdin", new=stdin):
+        with mock.patch("sys.stdout", new=StringIO()) as output_data:
+            application.start(["--binary"])
+            assert output_data.getvalue() == expected
+
+    # The standard streams stay open
+    stdin, stdout = StringIO(text), mock.Mock(buffer=io.BytesIO())
+    with mock.patch("sys.stdin", new=stdin), mock.patch("sys.stdout", new=stdout):
+        main(["-", "-"])
+    assert not stdin.closed and not stdout.buffer.closed
+    assert stdout.buffer.getvalue() == output.getvalue()
+
+
+def test_application_closes_input(tmp_path) -> None:
+    path = tmp_path / "orders.bin"
+    path.write_bytes(encode(Order(True, 1, 10, 20)))
+    files = []
+
+    def tracking_open(*args, **kwargs):
+        files.append(open(*args, **kwargs))
+        return files[-1]
+
+    with mock.patch("orderbook.application.open", tracking_open, create=True):
+        with mock.patch("sys.stdout", new=StringIO()):
+            application.start(["--binary", "--input", str(path)])
+    assert len(files) == 1 and files[0].closed
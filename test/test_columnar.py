@@ -0,0 +1,64 @@
+from orderbook.columnar import ColumnarOrderBook, RecordStore
+from orderbook.order import Order
+from orderbook.orderbookrecord import OrderBookRecord
+
+from .test_ladder import check_same_output
+
+
+def test_same_output_as_order_book(caplog) -> None:
+    check_same_output(caplog, ColumnarOrderBook, range(95, 106))
+
+
+def test_record_view() -> None:
+    store = RecordStore()
+    order = Order(True, 7, 10, 40, 15)
+    view = store.view(store.allocate(order, 3, 1))
+    record = OrderBookRecord(order, 3, 1)
+
+    assert repr(view) == repr(record)
+    assert view.is_buy is True
+    assert view.sort_key == record.sort_key
+
+    view.requeue(5, 2)
+    record.requeue(5, 2)
+    view.current_peak_size = 4
+    record.current_peak_size = 4
+    assert repr(view) == repr(record)
+    assert view.sort_key == record.sort_key
+
+
+def test_free_list() -> None:
+    store = RecordStore()
+    first = store.allocate(Order(False, 1, 10, 5), 1)
+    second = store.allocate(Order(False, 2, 11, 5), 2)
+    assert (first, second) == (0, 1) and len(store) == 2
+
+    store.release(first)
+    assert len(store) == 1
+    assert store.allocate(Order(True, 3, 12, 6, 2), 3) == first
+    assert len(store) == 2 and len(store.order_id) == 2
+    assert repr(store.view(first)) == "B,(p:12,t:3,n:0)->(visible:2,m:2,q:6)->(Id:3)"
+
+
+def test_slots_are_reused_by_the_book() -> None:
+    book = ColumnarOrderBook()
+    for order_id in range(1, 4):
+        book.add(Order(False, order_id, 10, 5))
+    assert repr(book.add(Order(True, 4, 10, 10))) == "[<4,1,10,5>, <4,2,10,5>]"
+    assert book.find(1) is None and book.find(2) is None
+    assert repr(book.find(3)) == "S,(p:10,t:3,n:0)->(visible:5,m:5,q:5)->(Id:3)"
+
+    book.add(Order(False, 5, 11, 5))
+    book.add(Order(False, 6, 12, 5))
+    assert len(book.store) == 3 and len(book.store.order_id) == 3
+    assert [x.order_id for x in book.sell] == [3, 5, 6]
+
+
+def test_id_uniqueness(caplog) -> None:
+    book = ColumnarOrderBook()
+    assert book.add(Order(True, 1, 10, 20)) == []
+    assert book.add(Order(False, 1, 11, 20)) == []
+    assert len(book.buy) == 1 and len(book.sell) == 0
+    assert caplog.record_tuples == [
+        ("root", 40, "Updating orders is prohibited: S,1,11,20,None")
+    ]
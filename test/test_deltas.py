@@ -0,0 +1,86 @@
+import random
+from io import StringIO
+
+import mock
+import pytest
+
+from orderbook import application
+from orderbook.book import OrderBook
+from orderbook.columnar import ColumnarOrderBook
+from orderbook.deltas import DeltaBook
+from orderbook.encoders import DeltaEncoder
+from orderbook.ladder import LadderOrderBook
+from orderbook.order import Order
+from orderbook.pricearray import ArrayOrderBook
+
+from .test_ladder import random_order
+
+
+def test_rebuild_from_deltas() -> None:
+    for seed in range(10):
+        rnd = random.Random(seed)
+        reference = OrderBook()
+        books = [OrderBook(), LadderOrderBook(), ArrayOrderBook(), ColumnarOrderBook()]
+        encoders = [DeltaEncoder() for _ in books]
+        encoders[0].snapshot_every = 17
+        rebuilt = [DeltaBook() for _ in books]
+        late = DeltaBook()
+
+        for order_id in range(1, 300):
+            order = random_order(rnd, order_id, reference, range(95, 106))
+            reference.add(order)
+            outputs = []
+            for book, encoder, delta_book in zip(books, encoders, rebuilt):
+                outputs.append(encoder.order(order, book.add(order), book))
+                delta_book.load(outputs[-1].splitlines())
+                assert str(delta_book) == str(reference)
+                assert len(delta_book) == len(book.buy) + len(book.sell)
+
+            # A consumer may join at any snapshot
+            if order_id == 100:
+                late.load(encoders[1].snapshot(books[1]).splitlines())
+            elif order_id > 100:
+                late.load(outputs[1].splitlines())
+                assert str(late) == str(reference)
+
+
+def test_deltas() -> None:
+    book, encoder = OrderBook(), DeltaEncoder()
+
+    def add(order: Order) -> str:
+        return encoder.order(order, book.add(order), book)
+
+    assert add(Order(False, 1, 10, 20, 5)) == "I,S,1,10,5\n"
+    assert add(Order(False, 2, 10, 10)) == "I,S,2,10,10\n"
+    assert add(Order(False, 2, 11, 10)) == ""
+    assert add(Order(True, 3, 10, 3)) == "3,1,10,3\nU,1,2\n"
+    assert add(Order(True, 4, 10, 4)) == "4,1,10,2\n4,2,10,2\nU,2,8\nM,1,5\n"
+    assert add(Order(True, 5, 11, 30)) == (
+        "5,2,10,8\n5,1,10,15\nR,2\nR,1\nI,B,5,11,7\n"
+    )
+    assert encoder.snapshot(book) == "C\nI,B,5,11,7\n"
+
+    with pytest.raises(ValueError, match="Unexpected delta: X,1"):
+        DeltaBook().apply("X,1")
+
+
+def test_application_deltas() -> None:
+    input_data = "S,1,10,20,5\nS,2,10,10\nB,3,10,3\nB,4,10,4\nS,5,11,1\n"
+    with mock.patch("sys.stdin", new=StringIO(input_data)):
+        with mock.patch("sys.stdout", new=StringIO()) as output_data:
+            application.start(["--format", "deltas", "--snapshot-every", "2"])
+            output = output_data.getvalue()
+
+    assert output == (
+        "I,S,1,10,5\n"
+        "C\nI,S,1,10,5\nI,S,2,10,10\n"
+        "3,1,10,3\nU,1,2\n"
+        "4,1,10,2\n4,2,10,2\nC\nI,S,2,10,8\nI,S,1,10,5\n"
+        "I,S,5,11,1\n"
+    )
+    with mock.patch("sys.stdin", new=StringIO(input_data)):
+        with mock.patch("sys.stdout", new=StringIO()) as output_data:
+            application.start([])
+            assert output_data.getvalue().endswith(
+                str(DeltaBook().load(output.splitlines())) + "\n"
+            )
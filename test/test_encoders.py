@@ -0,0 +1,124 @@
+import gzip
+import io
+import lzma
+from io import StringIO
+
+import mock
+import pytest
+
+from orderbook import application
+from orderbook.book import OrderBook
+from orderbook.encoders import (
+    ENCODERS,
+    TRADE,
+    BinaryEncoder,
+    BookEncoder,
+    CsvEncoder,
+    DeltaEncoder,
+    Encoder,
+    JsonLinesEncoder,
+    TextEncoder,
+    open_output,
+)
+from orderbook.order import Order
+from orderbook.transaction import Transaction
+
+ORDERS = "B,1,10,20,1\nB,2,9,20,3\nS,3,9,22\nB,4,10,5\nS,5,10,5\nS,6,8,1\n"
+
+
+def run(args, data: str = ORDERS) -> bytes:
+    raw = io.BytesIO()
+    stdout = io.TextIOWrapper(raw, write_through=True)
+    with mock.patch("sys.stdin", new=StringIO(data)):
+        with mock.patch("sys.stdout", new=stdout):
+            application.start(args)
+    return raw.getvalue()
+
+
+def test_encoders() -> None:
+    transactions = [Transaction(1, 3, 10, 20), Transaction(2, 3, 9, 2)]
+    assert TextEncoder().transactions(transactions) == "1,3,10,20\n2,3,9,2\n"
+    assert CsvEncoder().transactions(transactions) == "1,3,10,20\n2,3,9,2\n"
+    assert JsonLinesEncoder().transactions(transactions[1:]) == (
+        '{"buy_id":2,"sell_id":3,"price":9,"quantity":2}\n'
+    )
+    assert BinaryEncoder().transactions(transactions) == TRADE.pack(
+        1, 3, 10, 20
+    ) + TRADE.pack(2, 3, 9, 2)
+    assert TRADE.size == 14
+
+    book, order = OrderBook(), Order(True, 1, 10, 20)
+    book.add(order)
+    assert TextEncoder().order(order, transactions, book) == (
+        f"1,3,10,20\n2,3,9,2\n{book}\n"
+    )
+
+
+def test_encoder_interfaces() -> None:
+    for abstract in (Encoder, BookEncoder):
+        with pytest.raises(TypeError):
+            abstract()  # type: ignore
+    for encoder_type in ENCODERS.values():
+        encoder = encoder_type()
+        renders_book = isinstance(encoder, BookEncoder)
+        assert renders_book == (encoder_type in (TextEncoder, DeltaEncoder))
+        assert hasattr(encoder, "order") == renders_book
+
+
+def test_text_output_unchanged() -> None:
+    with mock.patch("sys.stdin", new=StringIO(ORDERS)):
+        with mock.patch("sys.stdout", new=StringIO()) as output_data:
+            application.start([])
+            expected = output_data.getvalue()
+
+    book, lines, top = OrderBook(), [], []
+    for line in ORDERS.splitlines():
+        transactions = [f"{t}\n" for t in book.add(Order.from_string(line))]
+        lines += transactions + [f"{book}\n"]
+        top += transactions + [f"{book.table(1)}\n"]
+    assert expected == "".join(lines)
+    assert run(["--top", "1"]).decode() == "".join(top)
+
+
+def test_trade_tape_formats(tmp_path) -> None:
+    csv = run(["--format", "csv"])
+    assert csv == (
+        b"buy_id,sell_id,price,quantity\n1,3,10,20\n2,3,9,2\n4,5,10,5\n2,6,9,1\n"
+    )
+    for batch_size in ("1", "2", "100"):
+        assert run(["--format", "csv", "--batch-size", batch_size]) == csv
+
+    jsonl = run(["--format", "jsonl"]).splitlines()
+    assert len(jsonl) == 4 and jsonl[2] == (
+        b'{"buy_id":4,"sell_id":5,"price":10,"quantity":5}'
+    )
+    binary = run(["--format", "binary", "--batch-size", "2"])
+    assert list(TRADE.iter_unpack(binary)) == [
+        (1, 3, 10, 20),
+        (2, 3, 9, 2),
+        (4, 5, 10, 5),
+        (2, 6, 9, 1),
+    ]
+
+    assert gzip.decompress(run(["--format", "csv", "--compress", "gzip"])) == csv
+    assert lzma.decompress(run(["--format", "binary", "--compress", "lzma"])) == binary
+
+    path = tmp_path / "trades.csv"
+    assert run(["--format", "csv", "--output", str(path)]) == b""
+    assert path.read_bytes() == csv
+    run(["--format", "binary", "--output", str(path), "--compress", "gzip"])
+    assert gzip.decompress(path.read_bytes()) == binary
+    run(["--format", "binary", "--output", str(path)])
+    assert path.read_bytes() == binary
+
+
+def test_open_output_keeps_stdout_open() -> None:
+    raw = io.BytesIO()
+    stdout = io.TextIOWrapper(raw)
+    with mock.patch("sys.stdout", new=stdout):
+        with open_output(None, True, "gzip") as output:
+            output.write(b"data")
+        with open_output(None, False) as output:
+            assert output is stdout
+    assert not stdout.closed
+    assert gzip.decompress(raw.getvalue()) == b"data"
@@ -0,0 +1,120 @@
+import logging
+import threading
+from io import StringIO
+
+import mock
+import pytest
+
+from orderbook import application
+from orderbook import book as book_module
+from orderbook.book import OrderBook
+from orderbook.events import (
+    DuplicateOrder,
+    Event,
+    OrderExecuted,
+    OrderFilled,
+    PeakUpdated,
+    RecordInserted,
+    TransactionExecuted,
+    background_logging,
+    emit,
+)
+from orderbook.order import Order
+from orderbook.orderbookrecord import OrderBookRecord
+from orderbook.transaction import Transaction
+
+
+class ThreadHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.messages = []
+        self.threads = set()
+
+    def emit(self, record: logging.LogRecord) -> None:
+        self.messages.append(record.getMessage())
+        self.threads.add(threading.current_thread())
+
+
+def test_events_keep_fields() -> None:
+    order = Order(True, 1, 10, 20, 5)
+    record = OrderBookRecord(order, 3, 1)
+    events = [
+        DuplicateOrder(order),
+        RecordInserted(record),
+        OrderExecuted(order),
+        TransactionExecuted(Transaction(1, 2, 10, 5)),
+        OrderFilled(order, record, 5, False),
+        OrderFilled(order, record, 5, True),
+        PeakUpdated(record),
+    ]
+    expected = [
+        f"Updating orders is prohibited: {order}",
+        f"Record inserted: {record}",
+        f"{order} was completely executed",
+        "Transaction: <1,2,10,5>",
+        f"{order} filled by visible {record}. Volume 5",
+        f"{order} filled by hidden {record}. Volume 5",
+        f"Peak updated: {record}",
+    ]
+    order.quantity = record.quantity = 1
+    record.requeue(4, 0)
+    assert list(map(str, events)) == expected
+
+
+def test_events_are_not_created_when_disabled(caplog) -> None:
+    caplog.set_level(logging.WARNING)
+    with mock.patch.object(book_module, "OrderFilled", side_effect=AssertionError):
+        with mock.patch.object(book_module, "emit", wraps=emit) as emit_mock:
+            book = OrderBook()
+            book.add(Order(True, 1, 10, 20, 5))
+            book.add(Order(False, 2, 10, 30))
+    assert emit_mock.call_count == 3
+    assert caplog.record_tuples == []
+
+
+def test_background_logging(caplog) -> None:
+    logger = logging.getLogger("orderbook.test")
+    handler = ThreadHandler()
+    with background_logging(logger, handler, level=logging.DEBUG) as listener:
+        assert logger.level == logging.DEBUG
+        thread = listener._thread  # type: ignore
+        book = OrderBook(logger)
+        book.add(Order(True, 1, 10, 20, 5))
+        book.add(Order(False, 2, 10, 30))
+    assert logger.level == logging.NOTSET and logger.handlers == []
+    assert handler.threads == {thread}
+    assert handler.messages == [m for _, _, m in caplog.record_tuples]
+    assert handler.messages[-1] == (
+        "Record inserted: S,(p:10,t:2,n:0)->(visible:10,m:10,q:10)->(Id:2)"
+    )
+
+
+def test_background_logging_formats_other_records() -> None:
+    logger = logging.getLogger("orderbook.test")
+    handler = ThreadHandler()
+    order = Order(True, 1, 10, 20)
+    with background_logging(logger, handler, level=logging.INFO):
+        logger.info("Line %d: %s", 1, order)
+        order.quantity = 5
+    assert handler.messages == ["Line 1: B,1,10,20,None"]
+
+
+def test_event_is_abstract() -> None:
+    with pytest.raises(TypeError):
+        Event()  # type: ignore
+
+
+def test_application_log(tmp_path) -> None:
+    path = tmp_path / "orders.log"
+    with mock.patch("sys.stdin", new=StringIO("B,1,10,20,5\nS,2,10,30\n")):
+        with mock.patch("sys.stdout", new=StringIO()):
+            application.start(["--log", str(path), "--log-level", "debug"])
+    lines = path.read_text().splitlines()
+    assert len(lines) == 7
+    assert lines[0].endswith(" INFO Line 1: B,1,10,20,5")
+    # Fields are those at the time of the event, not when it is written
+    assert lines[3].endswith(
+        " DEBUG S,2,10,25,None filled by visible "
+        "B,(p:10,t:1,n:0)->(visible:0,m:5,q:15)->(Id:1). Volume 5"
+    )
+    assert logging.getLogger().level == logging.WARNING
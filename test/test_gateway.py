@@ -0,0 +1,237 @@
+import asyncio
+import logging
+import os
+import signal
+import socket
+import threading
+import time
+
+import mock
+
+from orderbook import application
+from orderbook.book import OrderBook
+from orderbook.gateway import OrderGateway, serve
+from orderbook.journal import HEADER, Journal, read_journal
+
+
+async def wait_for(condition) -> None:
+    for _ in range(1000):
+        if condition():
+            return
+        await asyncio.sleep(0)
+    raise AssertionError("Condition is not met")
+
+
+def test_gateway_tcp(caplog) -> None:
+    async def run() -> None:
+        gateway = OrderGateway(line_limit=64)
+        server = await gateway.start_tcp("127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]  # type: ignore
+        seller = await asyncio.open_connection("127.0.0.1", port)
+        buyer = await asyncio.open_connection("127.0.0.1", port)
+
+        seller[1].write(b"S,1,10,20,5\n # comment\n\n")
+        await wait_for(lambda: gateway.book.find(1) is not None)
+        buyer[1].write(b"B,2,10,7\nB,3,10\n  B,4,10,5\n" + b"B" * 100 + b"\nB,5,11,3")
+        buyer[1].write_eof()
+
+        assert await buyer[0].readline() == b"2,1,10,7\n"
+        assert await buyer[0].readline() == b"ERROR,2\n"
+        assert await buyer[0].readline() == b"ERROR,3\n"
+        assert await buyer[0].readline() == b"ERROR,4\n"
+        assert await buyer[0].readline() == b"5,1,10,3\n"
+        assert await buyer[0].read() == b""
+        assert await seller[0].readline() == b"2,1,10,7\n"
+        assert await seller[0].readline() == b"5,1,10,3\n"
+        assert getattr(gateway.book.find(1), "quantity") == 10
+
+        # The resting order outlives the connection of its client
+        seller[1].close()
+        await wait_for(lambda: seller[0].at_eof())
+        client = await asyncio.open_connection("127.0.0.1", port)
+        client[1].write(b"B,6,10,20\n")
+        assert await client[0].readline() == b"6,1,10,10\n"
+        assert gateway.book.find(1) is None
+
+        client[1].close()
+        server.close()
+        await gateway.close()
+        await gateway.close()
+
+    caplog.set_level(logging.ERROR)
+    asyncio.run(run())
+    assert [message for _, _, message in caplog.record_tuples] == [
+        "Expected from 4 to 5 comma-separated values: 3",
+        "Client 2, line 2: Failed to parse order B,3,10\n",
+        "Client 2, line 3: Starts with whitespaces but is not a comment or empty.",
+        "Client 2, line 4: Input string is too long",
+    ]
+
+
+def test_gateway_unix(tmp_path) -> None:
+    async def run() -> None:
+        book = OrderBook()
+        gateway = OrderGateway(book)
+        path = str(tmp_path / "gateway.sock")
+        server = await gateway.start_unix(path)
+        reader, writer = await asyncio.open_unix_connection(path)
+        writer.write(b"B,1,10,20,5\nS,2,10,5\n")
+        assert await reader.readline() == b"1,2,10,5\n"
+        assert getattr(book.find(1), "quantity") == 15
+        writer.close()
+        server.close()
+        await gateway.close()
+
+    asyncio.run(run())
+
+
+def test_gateway_connection_lost(caplog) -> None:
+    async def run() -> None:
+        gateway = OrderGateway()
+        server = await gateway.start_tcp("127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]  # type: ignore
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        with mock.patch.object(
+            asyncio.StreamWriter, "drain", side_effect=ConnectionResetError
+        ):
+            writer.write(b"B,1,10,20\n")
+            assert await reader.read() == b""
+        writer.close()
+        server.close()
+        await gateway.close()
+
+    caplog.set_level(logging.INFO)
+    asyncio.run(run())
+    assert ("root", logging.INFO, "Client 1: Connection lost") in caplog.record_tuples
+
+
+def test_gateway_match_error(caplog) -> None:
+    async def run() -> None:
+        book = OrderBook()
+        process = book.process
+
+        def failing_process(orders):
+            yield from process(orders)
+            if orders[0].order_id == 3:
+                raise RuntimeError("Broken order")
+
+        gateway = OrderGateway(book)
+        server = await gateway.start_tcp("127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]  # type: ignore
+        seller = await asyncio.open_connection("127.0.0.1", port)
+        buyer = await asyncio.open_connection("127.0.0.1", port)
+
+        # The rest of an aggressive iceberg is less than its peak
+        seller[1].write(b"S,1,100,45\n")
+        await wait_for(lambda: book.find(1) is not None)
+        buyer[1].write(b"B,2,100,50,10\n")
+        assert await buyer[0].readline() == b"2,1,100,45\n"
+        assert await seller[0].readline() == b"2,1,100,45\n"
+        assert getattr(book.find(2), "quantity") == 5
+
+        with mock.patch.object(book, "process", side_effect=failing_process):
+            seller[1].write(b"S,3,100,7\n")
+            # Fills made before the error are reported to both clients
+            assert await seller[0].readline() == b"2,3,100,5\n"
+            assert await seller[0].readline() == b"ERROR,2\n"
+            assert await buyer[0].readline() == b"2,3,100,5\n"
+            buyer[1].write(b"B,4,100,2\n")
+            assert await buyer[0].readline() == b"4,3,100,2\n"
+            assert await seller[0].readline() == b"4,3,100,2\n"
+        for _, writer in (seller, buyer):
+            writer.close()
+        server.close()
+        await gateway.close()
+
+    asyncio.run(run())
+    assert "Failed to match order S,3,100,7,None" in caplog.text
+
+
+def test_gateway_journal(tmp_path) -> None:
+    path = str(tmp_path / "orders.journal")
+
+    async def run() -> None:
+        book = OrderBook()
+        book.journal = Journal(path, max_delay=3600)
+        gateway = OrderGateway(book)
+        server = await gateway.start_unix(str(tmp_path / "gateway.sock"))
+        reader, writer = await asyncio.open_unix_connection(
+            str(tmp_path / "gateway.sock")
+        )
+        writer.write(b"S,1,10,20\nB,2,10,5\n")
+        assert await reader.readline() == b"2,1,10,5\n"
+        # The idle gateway synced the group before replying
+        assert book.journal.pending == 0
+        assert [order.order_id for _, order in read_journal(path)] == [1, 2]
+        writer.close()
+        server.close()
+        await gateway.close()
+        book.journal.close()
+
+    asyncio.run(run())
+
+
+def test_serve(tmp_path) -> None:
+    async def run() -> None:
+        path = str(tmp_path / "gateway.sock")
+        task = asyncio.ensure_future(serve(OrderBook(), port=0, path=path))
+        await wait_for(lambda: (tmp_path / "gateway.sock").exists())
+        reader, writer = await asyncio.open_unix_connection(path)
+        writer.write(b"B,1,10,20\nS,2,10,5\n")
+        assert await reader.readline() == b"1,2,10,5\n"
+        writer.close()
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+    asyncio.run(run())
+
+
+def test_serve_sigterm(tmp_path) -> None:
+    async def run() -> None:
+        path = str(tmp_path / "gateway.sock")
+        task = asyncio.ensure_future(serve(OrderBook(), path=path))
+        await wait_for(lambda: signal.getsignal(signal.SIGTERM) != signal.SIG_DFL)
+        os.kill(os.getpid(), signal.SIGTERM)
+        await asyncio.wait_for(task, 1)
+
+    asyncio.run(run())
+
+
+def test_application_checkpoint_on_sigterm(tmp_path) -> None:
+    path = str(tmp_path / "gateway.sock")
+    journal = str(tmp_path / "orders.journal")
+    checkpoint = str(tmp_path / "book.snapshot")
+
+    def client() -> None:
+        while signal.getsignal(signal.SIGTERM) == signal.SIG_DFL:
+            time.sleep(0.01)
+        with socket.socket(socket.AF_UNIX) as connection:
+            connection.connect(path)
+            connection.sendall(b"S,1,10,20\nB,2,10,5\n")
+            assert connection.makefile("rb").readline() == b"2,1,10,5\n"
+        os.kill(os.getpid(), signal.SIGTERM)
+
+    thread = threading.Thread(target=client)
+    thread.start()
+    application.start(
+        ["--unix", path, "--journal", journal, "--checkpoint", checkpoint]
+    )
+    thread.join()
+    assert os.path.getsize(journal) == HEADER.size
+    assert getattr(OrderBook.restore(checkpoint).find(1), "quantity") == 15
+
+
+def test_application_gateway() -> None:
+    with mock.patch.object(application, "serve", new=mock.AsyncMock()) as serve_mock:
+        application.start(["--port", "7000"])
+        application.start(["--unix", "/tmp/orderbook.sock", "--host", "0.0.0.0"])
+    (book, *args), _ = serve_mock.call_args_list[0]
+    assert isinstance(book, OrderBook) and args == ["127.0.0.1", 7000, None]
+    assert serve_mock.call_args_list[1][0][1:] == (
+        "0.0.0.0",
+        None,
+        "/tmp/orderbook.sock",
+    )
@@ -0,0 +1,123 @@
+import random
+from io import StringIO
+
+import mock
+import pytest
+
+from orderbook import history as history_module
+from orderbook.book import OrderBook
+from orderbook.history import BookHistory
+from orderbook.journal import Journal, recover
+from orderbook.order import Order
+
+from .test_ladder import random_order
+
+
+def write_journal(path: str, book: OrderBook, rnd: random.Random, orders: range):
+    """
+    :return: Snapshots of the book after every journaled order and after
+        every timestamp
+    """
+    by_sequence, by_timestamp = [], {}
+    with Journal(path) as journal:
+        book.journal = journal
+        if book.find(100000) is None:
+            book.add(Order(True, 100000, 90, 10))
+            by_sequence.append(book.dumps())
+        for order_id in orders:
+            if rnd.random() < 0.2:
+                # Rejected, but takes a timestamp
+                book.add(Order(True, 100000, 90, 10))
+            else:
+                book.add(random_order(rnd, order_id, book, range(95, 106)))
+                by_sequence.append(book.dumps())
+            by_timestamp[book.timestamp] = book.dumps()
+    book.journal = None
+    return by_sequence, by_timestamp
+
+
+def test_history(tmp_path) -> None:
+    path = str(tmp_path / "orders.journal")
+    rnd = random.Random(0)
+    book = OrderBook()
+    by_sequence, by_timestamp = write_journal(path, book, rnd, range(1, 300))
+
+    history = BookHistory(path, interval=16)
+    assert len(history) == len(by_sequence)
+    assert history.at_sequence(0).dumps() == OrderBook().dumps()
+    for sequence, data in enumerate(by_sequence, 1):
+        assert history.at_sequence(sequence).dumps() == data
+
+    for timestamp, data in by_timestamp.items():
+        assert history.at_timestamp(timestamp).dumps() == data
+    assert history.at_timestamp(book.timestamp + 10).timestamp == book.timestamp + 10
+
+    more_sequence, more_timestamp = write_journal(path, book, rnd, range(300, 400))
+    history.update()
+    assert len(history) == len(by_sequence) + len(more_sequence)
+    assert history.at_sequence(len(history)).dumps() == more_sequence[-1]
+    timestamp = max(more_timestamp)
+    assert history.at_timestamp(timestamp).dumps() == more_timestamp[timestamp]
+
+    with pytest.raises(IndexError, match="Sequence number out of range: -1"):
+        history.at_sequence(-1)
+    with pytest.raises(IndexError, match="Sequence number out of range"):
+        history.at_sequence(len(history) + 1)
+
+
+def test_history_from_snapshot(tmp_path) -> None:
+    path = str(tmp_path / "orders.journal")
+    snapshot_path = str(tmp_path / "book.snapshot")
+    rnd = random.Random(1)
+    book = OrderBook()
+    for order_id in range(1, 50):
+        book.add(random_order(rnd, order_id, book, range(95, 106)))
+    book.snapshot(snapshot_path)
+    by_sequence, by_timestamp = write_journal(path, book, rnd, range(50, 100))
+
+    history = BookHistory(path, 5, snapshot_path)
+    assert history.at_sequence(0).dumps() == OrderBook.restore(snapshot_path).dumps()
+    assert history.at_sequence(len(by_sequence)).dumps() == by_sequence[-1]
+    assert history.at_timestamp(49).dumps() == OrderBook.restore(snapshot_path).dumps()
+    with pytest.raises(IndexError, match="Timestamp is before the history: 48"):
+        history.at_timestamp(48)
+
+
+def test_history_after_checkpoint_crash(tmp_path) -> None:
+    path = str(tmp_path / "orders.journal")
+    snapshot_path = str(tmp_path / "book.snapshot")
+    book = OrderBook()
+    with Journal(path) as book.journal:
+        book.add(Order(False, 1, 10, 5))
+        book.add(Order(True, 2, 10, 4))
+        # Crash after the snapshot of a checkpoint, before the journal is emptied
+        book.snapshot(snapshot_path)
+        book.add(Order(True, 3, 9, 5))
+        book.add(Order(True, 4, 10, 2))
+
+    history = BookHistory(path, 1, snapshot_path)
+    assert len(history) == 2
+    assert history.at_sequence(0).dumps() == OrderBook.restore(snapshot_path).dumps()
+    assert history.at_sequence(2).dumps() == book.dumps()
+    assert history.at_timestamp(3).dumps() == history.at_sequence(1).dumps()
+    assert repr(history.at_sequence(2)) == repr(recover(snapshot_path, path))
+    with pytest.raises(IndexError, match="Sequence number out of range: 3"):
+        history.at_sequence(3)
+
+
+def test_history_main(tmp_path) -> None:
+    path = str(tmp_path / "orders.journal")
+    with Journal(path) as journal:
+        book = OrderBook()
+        book.journal = journal
+        book.add(Order(True, 1, 10, 5))
+        book.add(Order(False, 2, 11, 5))
+        book.add(Order(False, 3, 10, 5))
+
+    with mock.patch("sys.stdout", new=StringIO()) as output:
+        history_module.main([path, "--sequence", "2"])
+        history_module.main([path, "--timestamp", "3", "--interval", "1"])
+    expected = OrderBook()
+    expected.add(Order(True, 1, 10, 5))
+    expected.add(Order(False, 2, 11, 5))
+    assert output.getvalue() == f"{expected}\n{book}\n"
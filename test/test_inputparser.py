@@ -1,7 +1,7 @@
 import io
 import logging
 
-from orderbook.inputparser import InputLexer
+from orderbook.inputparser import BulkInputLexer, InputLexer, MappedInputLexer
 
 
 def test_lexter_get(caplog) -> None:
@@ -113,3 +113,123 @@ def test_skip_rest_of_the_line_modelled() -> None:
 
     lexer._InputLexer__skip_rest_of_the_line()  # type: ignore
     assert stream.read() == ""
+
+
+def test_iteration() -> None:
+    stream = io.StringIO("B,1,11,111\n# comment\nS,2,22,222,2222\nB,3")
+    lexer = InputLexer(stream)
+    assert iter(lexer) is lexer
+    assert list(map(repr, lexer)) == ["B,1,11,111,None", "S,2,22,222,2222"]
+    assert list(lexer) == []
+
+
+def test_bulk_lexer_same_as_lexer(caplog) -> None:
+    caplog.set_level(logging.INFO)
+    data = (
+        "B,1,11,111\nS,2,22,222,2222\n            \n   #kkdkd\n B,3,33,333\n"
+        "B,4,44,444   \nBB,4,44,444   \n\t\x1c\n  #\né,1,2,3\nB,5,55," + "5" * 40
+    )
+    expected = list(map(repr, InputLexer(io.StringIO(data))))
+    expected_logs = caplog.record_tuples
+    assert len(expected) == 3 and len(expected_logs) == 14
+
+    for block_size in (1, 2, 3, 7, 64, 4096):
+        caplog.clear()
+        lexer = BulkInputLexer(io.StringIO(data), block_size)
+        assert iter(lexer) is lexer
+        assert list(map(repr, lexer)) == expected
+        assert caplog.record_tuples == expected_logs
+        assert lexer.get() is None
+
+
+def test_bulk_lexer_line_endings(caplog) -> None:
+    caplog.set_level(logging.INFO)
+    data = b"B,1,11,111\r\nS,2,22,222\r\r\nB,3,33,333\r  # \rB,4,44,444\r"
+    stream = io.TextIOWrapper(io.BytesIO(data), encoding="utf-8")
+    expected = list(map(repr, InputLexer(stream)))
+    expected_logs = caplog.record_tuples
+    assert len(expected) == 4
+
+    for block_size in (1, 2, 11, 12, 4096):
+        caplog.clear()
+        stream = io.TextIOWrapper(io.BytesIO(data), encoding="utf-8")
+        assert list(map(repr, BulkInputLexer(stream, block_size))) == expected
+        assert caplog.record_tuples == expected_logs
+
+    caplog.clear()
+    raw = io.BytesIO(b"B,1,11,111\r\nS,2,22,222\r")
+    assert list(map(repr, BulkInputLexer(raw))) == [
+        "B,1,11,111,None",
+        "S,2,22,222,None",
+    ]
+
+
+def test_bulk_lexer_long_lines(caplog) -> None:
+    data = (
+        "B,1,1,1" + "1" * 100 + "\n" + " " * 100 + "#\n" + " " * 100 + "x\n" + "B,2,2,2"
+    )
+    for block_size in (1, 16, 4096):
+        lexer = BulkInputLexer(io.StringIO(data), block_size, 10)
+        assert lexer.line_limit == 41
+        assert repr(lexer.get()) == "B,2,2,2,None"
+        assert caplog.record_tuples == [
+            ("root", 40, "Input string is too long: 108"),
+            ("root", 40, "Line 1: Failed to parse order B,1,1,1" + "1" * 35 + "\n"),
+            (
+                "root",
+                40,
+                "Line 3: Starts with whitespaces but is not a comment or empty.",
+            ),
+        ]
+        caplog.clear()
+
+
+def test_mapped_lexer_same_as_bulk_lexer(caplog, tmp_path) -> None:
+    caplog.set_level(logging.INFO)
+    data = (
+        b"B,1,11,111\r\nS,2,22,222,2222\n            \n   #kkdkd\n B,3,33,333\n"
+        b"B,4,44,444   \n\r\n\t\x1c\n  #\n\xc3\xa9,1,2,3\n"
+        + b" " * 100
+        + b"#\n"
+        + b" " * 100
+        + b"x\n"
+        + b"B,5,55,5"
+        + b"5" * 100
+        + b"\nB,6,66,66"
+    )
+    path = tmp_path / "orders.txt"
+    path.write_bytes(data)
+    lexer = BulkInputLexer(io.BytesIO(data.replace(b"\r\n", b"\n")), 7, 41)
+    expected = list(map(repr, lexer))
+    expected_logs = caplog.record_tuples
+    assert len(expected) == 4 and len(expected_logs) == 16
+
+    caplog.clear()
+    lexer = MappedInputLexer(str(path), 41)
+    assert list(map(repr, lexer)) == expected
+    assert caplog.record_tuples == expected_logs
+    assert lexer.get() is None
+
+
+def test_mapped_lexer_line_endings(caplog, tmp_path) -> None:
+    caplog.set_level(logging.INFO)
+    data = (
+        b"B,1,11,111\r\nS,2,22,222\r\r\nB,3,33,333\r  # \rB,4,44,444\r\n\r"
+        b"S,5,5,5\r  # the file ends with lines which are not orders\r\r"
+    )
+    stream = io.TextIOWrapper(io.BytesIO(data), encoding="utf-8")
+    expected = list(map(repr, InputLexer(stream)))
+    expected_logs = caplog.record_tuples
+    assert len(expected) == 5 and len(expected_logs) == 10
+
+    caplog.clear()
+    path = tmp_path / "orders.txt"
+    path.write_bytes(data)
+    assert list(map(repr, MappedInputLexer(str(path)))) == expected
+    assert caplog.record_tuples == expected_logs
+
+
+def test_mapped_lexer_empty_file(tmp_path) -> None:
+    path = tmp_path / "orders.txt"
+    path.write_bytes(b"")
+    assert list(MappedInputLexer(str(path))) == []
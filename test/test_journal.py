@@ -0,0 +1,252 @@
+import logging
+import os
+import random
+import time
+from io import StringIO
+
+import mock
+import pytest
+
+from orderbook import application
+from orderbook.book import OrderBook
+from orderbook.columnar import ColumnarOrderBook
+from orderbook.deltas import DeltaBook
+from orderbook.journal import ENTRY, HEADER, Journal, read_journal, recover
+from orderbook.ladder import LadderOrderBook
+from orderbook.order import Order
+from orderbook.pricearray import ArrayOrderBook
+
+from .test_ladder import random_order
+from .test_registry import Clock
+
+
+def test_journal_group_commit(tmp_path) -> None:
+    path = str(tmp_path / "orders.journal")
+    clock = Clock()
+    with mock.patch("os.fsync") as fsync:
+        journal = Journal(path, group_size=3, max_delay=1, clock=clock)
+        assert fsync.call_count == 1
+        book = OrderBook()
+        book.journal = journal
+        book.add(Order(True, 1, 10, 5))
+        book.add(Order(True, 1, 10, 5))
+        book.add(Order(False, 2, 10, 20, 5))
+        assert fsync.call_count == 1 and os.path.getsize(path) == HEADER.size
+        assert journal.pending == 2
+        book.add(Order(False, 3, 11, 20))
+        assert fsync.call_count == 2 and journal.pending == 0
+        assert os.path.getsize(path) == HEADER.size + 3 * ENTRY.size
+
+        book.add(Order(False, 4, 11, 20))
+        clock.now = 1
+        book.add(Order(False, 5, 11, 20))
+        assert fsync.call_count == 3
+        book.add(Order(False, 6, 11, 20))
+        journal.close()
+        journal.close()
+        assert fsync.call_count == 4
+
+    entries = [(timestamp, repr(order)) for timestamp, order in read_journal(path)]
+    assert entries == [
+        (1, "B,1,10,5,None"),
+        (3, "S,2,10,20,5"),
+        (4, "S,3,11,20,None"),
+        (5, "S,4,11,20,None"),
+        (6, "S,5,11,20,None"),
+        (7, "S,6,11,20,None"),
+    ]
+
+
+def test_add_many_journal(tmp_path) -> None:
+    orders = [Order(True, 1, 10, 5), Order(True, 1, 10, 5), Order(False, 2, 10, 8)]
+    entries = []
+    for is_batch in (False, True):
+        path = str(tmp_path / f"{is_batch}.journal")
+        book = OrderBook()
+        with Journal(path) as book.journal:
+            if is_batch:
+                book.add_many(orders)
+            else:
+                for order in orders:
+                    book.add(order)
+        entries.append([repr(entry) for entry in read_journal(path)])
+    assert entries[0] == entries[1] and len(entries[0]) == 2
+
+
+@pytest.mark.parametrize(
+    "engine", [OrderBook, LadderOrderBook, ArrayOrderBook, ColumnarOrderBook]
+)
+def test_engines_journal(engine, tmp_path) -> None:
+    path = str(tmp_path / "orders.journal")
+    book = engine()
+    with Journal(path) as book.journal:
+        book.add(Order(True, 1, 10, 5))
+        book.add(Order(True, 1, 10, 5))
+        book.add_many([Order(False, 2, 11, 8, 4), Order(True, 3, 11, 5)])
+    entries = [(timestamp, repr(order)) for timestamp, order in read_journal(path)]
+    assert entries == [(1, "B,1,10,5,None"), (3, "S,2,11,8,4"), (4, "B,3,11,5,None")]
+    assert str(recover(None, path)) == str(book)
+
+
+def test_durable_output(tmp_path) -> None:
+    written: list = []
+    with Journal(str(tmp_path / "orders.journal"), group_size=2) as journal:
+        book = OrderBook()
+        book.journal = journal
+        with application.durable_output(written.append, journal) as write:
+            write(book.add(Order(False, 1, 10, 5)))
+            assert written == []
+            write(book.add(Order(True, 2, 10, 2)))
+            assert len(written) == 2 and not journal.pending
+            write(book.add(Order(True, 3, 10, 2)))
+            assert len(written) == 2
+        assert [str(data) for data in written[1:]] == ["[<2,1,10,2>]", "[<3,1,10,2>]"]
+        assert not journal.pending
+
+    with application.durable_output(written.append, None) as write:
+        assert write == written.append
+
+
+def test_durable_output_idle(tmp_path) -> None:
+    written: list = []
+    path = str(tmp_path / "orders.journal")
+    with Journal(path, group_size=100, max_delay=0.5) as journal:
+        book = OrderBook()
+        book.journal = journal
+        with application.durable_output(written.append, journal) as write:
+            write(book.add(Order(False, 1, 10, 5)))
+            write(book.add(Order(True, 2, 10, 2)))
+            assert journal.pending == 2 and written == []
+            # No more orders arrive, the held output is written anyway
+            deadline = time.monotonic() + 5
+            while len(written) < 2 and time.monotonic() < deadline:
+                time.sleep(0.01)
+            assert [str(data) for data in written] == ["[]", "[<2,1,10,2>]"]
+            assert not journal.pending
+            assert os.path.getsize(path) == HEADER.size + 2 * ENTRY.size
+
+
+def test_recover(tmp_path, caplog) -> None:
+    path = str(tmp_path / "orders.journal")
+    snapshot_path = str(tmp_path / "book.snapshot")
+    assert recover(snapshot_path, path).timestamp == 0
+
+    rnd = random.Random(0)
+    book = OrderBook()
+    with Journal(path, group_size=50) as journal:
+        book.journal = journal
+        for order_id in range(1, 300):
+            book.add(random_order(rnd, order_id, book, range(95, 106)))
+            if order_id == 100:
+                journal.checkpoint(book, snapshot_path)
+            if order_id == 200:
+                # A crash between the snapshot and emptying the journal
+                journal.sync()
+                book.snapshot(snapshot_path)
+            # Mostly duplicates, which take a timestamp but are not journaled
+            book.add(Order(True, order_id, 10, 5))
+
+    recovered = recover(snapshot_path, path)
+    assert recovered.dumps() == book.dumps()
+    assert recover(None, path).timestamp == book.timestamp
+
+    count = (os.path.getsize(path) - HEADER.size) // ENTRY.size
+    # A torn entry of a group which was never synced
+    with open(path, "ab") as file:
+        file.write(b"\x01" * (ENTRY.size + 5))
+    size = os.path.getsize(path)
+    assert recover(snapshot_path, path).dumps() == book.dumps()
+    assert os.path.getsize(path) == size - ENTRY.size - 5
+    assert caplog.record_tuples[-1] == (
+        "root",
+        logging.WARNING,
+        f"Journal {path}: {ENTRY.size + 5} bytes after entry {count} are not valid",
+    )
+
+    with open(path, "r+b") as file:
+        file.write(b"X")
+    with pytest.raises(ValueError, match="Not an order journal"):
+        recover(snapshot_path, path)
+
+
+def test_recover_skips_failed_order(tmp_path, caplog) -> None:
+    path = str(tmp_path / "orders.journal")
+    with Journal(path) as journal:
+        book = OrderBook()
+        book.journal = journal
+        for order in (Order(False, 1, 10, 5), Order(True, 2, 9, 5)):
+            book.add(order)
+        # Journaled before matching fails
+        journal.append(3, Order(True, 3, 10, 2))
+        book.timestamp = 3
+        book.add(Order(True, 4, 10, 1))
+
+    add = OrderBook.add
+
+    def failing_add(self, order):
+        if order.order_id == 3:
+            raise AssertionError("Broken order")
+        return add(self, order)
+
+    with mock.patch.object(OrderBook, "add", autospec=True, side_effect=failing_add):
+        recovered = recover(None, path)
+    assert recovered.timestamp == 4 and recovered.find(3) is None
+    assert repr(recovered) == repr(book)
+    assert caplog.record_tuples[-1] == (
+        "root",
+        logging.ERROR,
+        f"Journal {path}: Failed to replay order B,3,10,2,None of timestamp 3",
+    )
+
+
+def test_checkpoint_on_interrupt(tmp_path) -> None:
+    journal = str(tmp_path / "orders.journal")
+    checkpoint = str(tmp_path / "book.snapshot")
+    options = application.parse_args(["--journal", journal, "--checkpoint", checkpoint])
+    with pytest.raises(KeyboardInterrupt):
+        with application.open_book(options) as book:
+            book.add(Order(True, 1, 10, 5))
+            raise KeyboardInterrupt
+    assert os.path.getsize(journal) == HEADER.size
+    assert repr(OrderBook.restore(checkpoint)) == repr(book)
+
+
+def test_application_journal(tmp_path) -> None:
+    journal = str(tmp_path / "orders.journal")
+    checkpoint = str(tmp_path / "book.snapshot")
+
+    def run(input_data: str, *args: str) -> str:
+        with mock.patch("sys.stdin", new=StringIO(input_data)):
+            with mock.patch("sys.stdout", new=StringIO()) as output_data:
+                application.start(["--journal", journal, *args])
+                return output_data.getvalue()
+
+    run("S,1,10,20,5\nS,2,10,10\n")
+    assert os.path.getsize(journal) == HEADER.size + 2 * ENTRY.size
+    run("B,3,10,8\n", "--checkpoint", checkpoint, "--format", "csv")
+    assert os.path.getsize(journal) == HEADER.size
+    assert run("B,4,10,8\n", "--checkpoint", checkpoint, "--format", "csv") == (
+        "buy_id,sell_id,price,quantity\n4,2,10,7\n4,1,10,1\n"
+    )
+    assert str(recover(checkpoint, journal)) == str(
+        OrderBook.loads(OrderBook.restore(checkpoint).dumps())
+    )
+
+
+def test_application_journal_deltas(tmp_path) -> None:
+    journal = str(tmp_path / "orders.journal")
+    checkpoint = str(tmp_path / "book.snapshot")
+
+    def run(input_data: str, *args: str) -> str:
+        with mock.patch("sys.stdin", new=StringIO(input_data)):
+            with mock.patch("sys.stdout", new=StringIO()) as output_data:
+                application.start(["--journal", journal, *args])
+                return output_data.getvalue()
+
+    assert run("S,1,10,20,5\n", "--format", "deltas") == "I,S,1,10,5\n"
+    run("S,2,11,10\n", "--checkpoint", checkpoint)
+    output = run("B,3,10,8\n", "--checkpoint", checkpoint, "--format", "deltas")
+    assert output == "C\nI,S,1,10,5\nI,S,2,11,10\n3,1,10,8\nM,1,2\n"
+    assert str(DeltaBook().load(output.splitlines())) == str(
+        DeltaBook().load(["I,S,2,11,10", "I,S,1,10,2"])
+    )
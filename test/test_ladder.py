@@ -0,0 +1,94 @@
+import random
+from logging import DEBUG
+from typing import Sequence, Type
+
+from orderbook.book import OrderBook
+from orderbook.ladder import LadderOrderBook, PriceLadder
+from orderbook.order import Order
+from orderbook.orderbookrecord import OrderBookRecord
+
+
+def random_order(
+    rnd: random.Random, order_id: int, book: OrderBook, prices: Sequence[int]
+) -> Order:
+    is_buy = rnd.random() < 0.5
+    price = rnd.choice(prices)
+    quantity = rnd.randint(1, 100)
+    peak_size = rnd.choice([None, rnd.randint(1, quantity)])
+
+    # Aggressive icebergs are covered by test_aggressive_iceberg_rest
+    against = book.sell if is_buy else book.buy
+    if against and (against[0].price <= price if is_buy else against[0].price >= price):
+        peak_size = None
+    return Order(is_buy, order_id, price, quantity, peak_size)
+
+
+def check_same_output(caplog, book_type: Type[OrderBook], prices: Sequence[int]):
+    caplog.set_level(DEBUG)
+    for seed in range(20):
+        rnd = random.Random(seed)
+        expected_book, book = OrderBook(), book_type()
+        for order_id in range(1, 200):
+            order = random_order(rnd, order_id, expected_book, prices)
+            expected = repr(expected_book.add(order))
+            expected_logs = caplog.record_tuples
+            caplog.clear()
+
+            assert repr(book.add(order)) == expected
+            assert caplog.record_tuples == expected_logs
+            assert str(book) == str(expected_book)
+            assert repr(book) == repr(expected_book)
+            assert len(book.buy) == len(expected_book.buy)
+            assert len(book.sell) == len(expected_book.sell)
+            for record in expected_book.buy:
+                assert repr(book.find(record.order_id)) == repr(record)
+            assert book.find(order_id + 1) is None
+            caplog.clear()
+
+
+def test_same_output_as_order_book(caplog) -> None:
+    check_same_output(caplog, LadderOrderBook, range(95, 106))
+
+
+def test_id_uniqueness(caplog) -> None:
+    book = LadderOrderBook()
+
+    assert book.add(Order(True, 1, 10, 20, 5)) == []
+    assert book.add(Order(False, 1, 10, 20)) == []
+    assert len(book.buy) == 1 and len(book.sell) == 0
+    assert caplog.record_tuples == [
+        ("root", 40, "Updating orders is prohibited: S,1,10,20,None")
+    ]
+    caplog.clear()
+
+    assert repr(book.add(Order(False, 2, 10, 20))) == "[<1,2,10,20>]"
+    assert len(book.buy) == 0
+    assert book.find(1) is None
+    assert repr(book.add(Order(False, 1, 10, 20))) == "[]"
+    assert len(book.sell) == 1
+    assert book.find(1) is next(iter(book.sell))
+
+
+def test_price_ladder() -> None:
+    ladder = PriceLadder(True)
+    assert ladder.best() is None
+
+    for order_id, price in enumerate([10, 12, 11, 12], start=1):
+        ladder.append(OrderBookRecord(Order(True, order_id, price, 5), order_id))
+    assert len(ladder) == 4
+    assert [x.order_id for x in ladder] == [2, 4, 3, 1]
+
+    price, level = ladder.best()  # type: ignore
+    assert price == 12 and [x.order_id for x in level] == [2, 4]
+
+    level[0].quantity = 0
+    level[0].timestamp = 5
+    ladder.settle(12, 1, 5)
+    assert len(ladder) == 3
+    assert [x.order_id for x in ladder] == [4, 3, 1]
+
+    level[0].quantity = 0
+    level[0].timestamp = 6
+    ladder.settle(12, 1, 6)
+    assert ladder.best()[0] == 11  # type: ignore
+    assert len(ladder) == 2
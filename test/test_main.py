@@ -2,6 +2,8 @@ from io import StringIO
 
 import mock
 
+from orderbook import application
+
 
 def test_init():
     input_data = (
@@ -162,3 +164,24 @@ def test_two_icebergs_sell() -> None:
 
 """
                 )
+
+
+def test_input_modes(tmp_path) -> None:
+    input_data = "B,1,10,20,1\r\n # comment\nB,2,9,20,3\n\nS,3,9,22"
+    with mock.patch("sys.stdin", new=StringIO(input_data)):
+        with mock.patch("sys.stdout", new=StringIO()) as output_data:
+            application.start(["10"])
+            expected = output_data.getvalue()
+    assert expected.count("+\n") == 9
+
+    with mock.patch("sys.stdin", new=StringIO(input_data)):
+        with mock.patch("sys.stdout", new=StringIO()) as output_data:
+            application.start(["--bulk"])
+            assert output_data.getvalue() == expected
+
+    path = tmp_path / "orders.txt"
+    path.write_bytes(input_data.encode())
+    with mock.patch("sys.stdin", new=StringIO()):
+        with mock.patch("sys.stdout", new=StringIO()) as output_data:
+            application.start(["--input", str(path), "--unknown"])
+            assert output_data.getvalue() == expected
@@ -1,3 +1,7 @@
+import logging
+
+import pytest
+
 from orderbook.order import Order
 
 
@@ -85,3 +89,33 @@ def test_create() -> None:
     assert order.price == 2
     assert order.quantity == 3
     assert order.peak_size is None
+
+    # bool is an int subclass, so it passes validation the same way it used to
+    order = Order.create(is_buy=False, order_id=True, price=2, quantity=3)
+    assert repr(order) == "S,True,2,3,None"
+
+
+def test_slots() -> None:
+    order = Order.create(is_buy=True, order_id=1, price=2, quantity=3, peak_size=1)
+    assert not hasattr(order, "__dict__")
+    try:
+        order.logger = None  # type: ignore
+        assert False
+    except AttributeError:
+        pass
+
+
+def test_copy() -> None:
+    order = Order.create(is_buy=False, order_id=1, price=2, quantity=3, peak_size=1)
+    copy = order.copy()
+    assert copy is not order
+    assert repr(copy) == repr(order)
+
+    copy.quantity = 2
+    assert order.quantity == 3
+
+
+def test_deprecated_logger() -> None:
+    with pytest.warns(DeprecationWarning):
+        order = Order(True, 1, 2, 3, None, logging.getLogger())
+    assert repr(order) == "B,1,2,3,None"
@@ -1,5 +1,15 @@
+import io
+import random
+from logging import DEBUG
+
 from orderbook.book import OrderBook, OrderBookRecord
+from orderbook.columnar import ColumnarOrderBook
+from orderbook.ladder import LadderOrderBook
 from orderbook.order import Order
+from orderbook.pricearray import ArrayOrderBook
+from orderbook.transaction import Transaction
+
+from .test_ladder import random_order
 
 
 def test_simple_output(caplog) -> None:
@@ -125,6 +135,30 @@ def test_order_record_comparison() -> None:
         )
 
 
+def test_sort_key() -> None:
+    record = OrderBookRecord(Order(True, 1, 10, 1), 1)
+    assert record.sort_key == (-10, 1, 0)
+    record.requeue(3, 2)
+    assert (record.timestamp, record.order_priority) == (3, 2)
+    assert record.sort_key == (-10, 3, 2)
+
+    record = OrderBookRecord(Order(False, 1, 10, 1), 4, 5)
+    assert record.sort_key == (10, 4, 5)
+
+
+def test_equal_priorities_keep_queue_order() -> None:
+    book = OrderBook()
+    book.add(Order(True, 1, 10, 8, 2))
+    book.add(Order(True, 2, 10, 12, 1))
+    book.add(Order(True, 3, 10, 12, 1))
+    book.add(Order(False, 4, 10, 10))
+    book.add(Order(False, 5, 10, 9))
+    assert [(x.order_id, x.sort_key) for x in book.buy] == [
+        (2, (-10, 5, 1)),
+        (3, (-10, 5, 1)),
+    ]
+
+
 def test_id_uniqueness(caplog) -> None:
     book = OrderBook()
 
@@ -139,3 +173,186 @@ def test_id_uniqueness(caplog) -> None:
     assert caplog.record_tuples == [
         ("root", 40, "Updating orders is prohibited: B,1138,31502,7500,None")
     ]
+    caplog.clear()
+
+    assert repr(book.find(1138)) == repr(next(iter(book.buy)))
+    assert book.find(1139) is None
+
+    assert repr(add("S,1139,31502,7500")) == "[<1138,1139,31502,7500>]"
+    assert book.find(1138) is None
+    assert book.find(1139) is None
+
+    assert add("B,1138,31502,7500") == []
+    assert len(book.buy) == 1 and len(book.sell) == 0
+    assert book.find(1138) is book.buy[0]
+    assert len(caplog.record_tuples) == 0
+
+
+def test_orders_are_not_changed() -> None:
+    book = OrderBook()
+    orders = [
+        Order(True, 1, 10, 40, 20),
+        Order(False, 2, 10, 30),
+        Order(False, 3, 9, 5),
+    ]
+    for order in orders:
+        book.add(order)
+    assert list(map(repr, orders)) == ["B,1,10,40,20", "S,2,10,30,None", "S,3,9,5,None"]
+    assert book.find(1).quantity == 5  # type: ignore
+
+
+def test_aggressive_iceberg_rest() -> None:
+    for book_type in (OrderBook, LadderOrderBook, ArrayOrderBook, ColumnarOrderBook):
+        book = book_type()
+        book.add(Order(False, 1, 100, 45))
+        assert repr(book.add(Order(True, 2, 100, 50, 10))) == "[<2,1,100,45>]"
+        assert repr(book.find(2)) == ("B,(p:100,t:2,n:0)->(visible:5,m:5,q:5)->(Id:2)")
+        assert repr(book.add(Order(False, 3, 100, 7))) == "[<2,3,100,5>]"
+        assert book.find(2) is None and book.find(3) is not None
+
+
+def test_slots() -> None:
+    record = OrderBookRecord(Order(True, 1, 1, 1), 1)
+    transaction = Transaction(1, 2, 3, 4)
+    assert not hasattr(record, "__dict__")
+    assert not hasattr(transaction, "__dict__")
+    assert repr(transaction) == "<1,2,3,4>" and str(transaction) == "1,2,3,4"
+
+
+def test_passive_order_does_not_touch_opposite_side(caplog) -> None:
+    caplog.set_level(DEBUG)
+    book = OrderBook()
+    book.add(Order(False, 1, 10, 5))
+    sell = book.sell
+    caplog.clear()
+
+    assert book.add(Order(True, 2, 9, 5)) == []
+    assert book.sell is sell and sell[0].timestamp == 1
+    assert caplog.record_tuples == [
+        ("root", 20, "Record inserted: B,(p:9,t:2,n:0)->(visible:5,m:5,q:5)->(Id:2)")
+    ]
+
+
+def test_add_many() -> None:
+    orders = [
+        Order(True, 1, 10, 40, 20),
+        Order(False, 2, 10, 30),
+        Order(True, 1, 10, 40, 20),
+        Order(False, 3, 9, 5),
+        Order(True, 4, 11, 30),
+    ]
+    for book_type in (OrderBook, LadderOrderBook, ArrayOrderBook, ColumnarOrderBook):
+        book, expected_book = book_type(), book_type()
+        expected = [expected_book.add(order) for order in orders]
+        assert repr(book.add_many(iter(orders))) == repr(expected)
+        assert repr(book) == repr(expected_book)
+        assert book.add_many([]) == []
+
+
+def test_add_many_random(caplog) -> None:
+    caplog.set_level(DEBUG)
+    for book_type in (OrderBook, LadderOrderBook, ArrayOrderBook, ColumnarOrderBook):
+        rnd = random.Random(1)
+        book, expected_book = book_type(), OrderBook()
+        for _ in range(20):
+            orders, expected = [], []
+            for _ in range(rnd.randint(0, 30)):
+                order_id = rnd.randint(1, 300)
+                orders.append(
+                    random_order(rnd, order_id, expected_book, range(95, 106))
+                )
+                expected.append(expected_book.add(orders[-1]))
+            expected_logs = caplog.record_tuples
+            caplog.clear()
+
+            assert repr(book.add_many(orders)) == repr(expected)
+            assert caplog.record_tuples == expected_logs
+            assert repr(book) == repr(expected_book)
+            caplog.clear()
+
+
+def test_process() -> None:
+    orders = [
+        Order(False, 1, 10, 5),
+        Order(False, 2, 11, 5),
+        Order(True, 3, 11, 12),
+        Order(True, 3, 11, 12),
+        Order(False, 4, 9, 1),
+    ]
+    for book_type in (OrderBook, LadderOrderBook, ArrayOrderBook, ColumnarOrderBook):
+        expected_book = book_type()
+        expected = [t for order in orders for t in expected_book.add(order)]
+        assert repr(expected) == "[<3,1,10,5>, <3,2,11,5>, <3,4,11,1>]"
+
+        book = book_type()
+        transactions = book.process(iter(orders))
+        assert repr(next(transactions)) == "<3,1,10,5>"
+        # The second level is not matched until the consumer asks for it
+        assert book.find(2).quantity == 5  # type: ignore
+        assert repr(list(transactions)) == "[<3,2,11,5>, <3,4,11,1>]"
+        assert repr(book) == repr(expected_book)
+
+
+def test_process_close(caplog) -> None:
+    orders = [Order(False, 1, 10, 5), Order(False, 2, 11, 5), Order(True, 3, 12, 12)]
+    for book_type in (OrderBook, LadderOrderBook, ArrayOrderBook, ColumnarOrderBook):
+        expected_book = book_type()
+        list(expected_book.process(iter(orders)))
+        expected_logs = caplog.record_tuples
+        caplog.clear()
+
+        book = book_type()
+        transactions = book.process(iter(orders))
+        assert repr(next(transactions)) == "<3,1,10,5>"
+        transactions.close()
+        # The order is matched and its rest inserted although nobody takes it
+        assert repr(book) == repr(expected_book)
+        assert repr(book.find(3)) == repr(expected_book.find(3))
+        assert caplog.record_tuples == expected_logs
+        caplog.clear()
+
+
+def test_table_rendering() -> None:
+    def expected_table(book: OrderBook, top_n=None) -> str:
+        buy, sell = list(book.buy)[:top_n], list(book.sell)[:top_n]
+        rows = str(OrderBook()).split("\n")
+        for row in range(max(len(buy), len(sell))):
+            columns = [""]
+            if row < len(buy):
+                record = buy[row]
+                columns += [
+                    f"{record.order_id:10}",
+                    f"{record.current_peak_size:13,}",
+                    f"{record.price:7,}",
+                ]
+            else:
+                columns += [" " * 10, " " * 13, " " * 7]
+            if row < len(sell):
+                record = sell[row]
+                columns += [
+                    f"{record.price:7,}",
+                    f"{record.current_peak_size:13,}",
+                    f"{record.order_id:10}",
+                ]
+            else:
+                columns += [" " * 7, " " * 13, " " * 10]
+            rows.insert(-1, "|".join(columns + [""]))
+        return "\n".join(rows)
+
+    book = ColumnarOrderBook()
+    book.renderer.CHUNK = 4
+    for order_id in range(1, 400):
+        is_buy = order_id % 2 == 0
+        price = 1000 + (order_id * 7919) % 50
+        book.add(Order(is_buy, order_id, price, order_id * 997, order_id % 5 or None))
+
+        if order_id % 10 == 0:
+            assert str(book) == expected_table(book)
+            assert book.table(3) == expected_table(book, 3)
+            assert book.table(0) == expected_table(book, 0)
+            output = io.StringIO()
+            book.write_table(output)
+            assert output.getvalue() == str(book)
+            output = io.StringIO()
+            book.write_table(output, 5)
+            assert output.getvalue() == book.table(5)
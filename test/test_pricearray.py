@@ -0,0 +1,44 @@
+from orderbook.order import MAX_PRICE, Order
+from orderbook.orderbookrecord import OrderBookRecord
+from orderbook.pricearray import ArrayOrderBook, PriceArray
+
+from .test_ladder import check_same_output
+
+
+def test_same_output_as_order_book(caplog) -> None:
+    check_same_output(caplog, ArrayOrderBook, range(95, 106))
+    check_same_output(caplog, ArrayOrderBook, [1, 2, 63, 64, 65, 4000, MAX_PRICE])
+
+
+def test_price_array() -> None:
+    for is_buy, order in (
+        (True, [MAX_PRICE, 64, 63, 1]),
+        (False, [1, 63, 64, MAX_PRICE]),
+    ):
+        side = PriceArray(is_buy)
+        assert side.best() is None and list(side) == []
+
+        for order_id, price in enumerate([64, 1, MAX_PRICE, 63, 64], start=1):
+            side.append(OrderBookRecord(Order(is_buy, order_id, price, 5), order_id))
+        assert len(side) == 5
+        assert [x.price for x in side] == sorted([64] + order, reverse=is_buy)
+
+        while side.best() is not None:
+            price, level = side.best()  # type: ignore
+            assert price == order[0]
+            for record in level:
+                record.quantity = 0
+            side.settle(price, len(level), 6)
+            if not level:
+                order.pop(0)
+        assert order == [] and len(side) == 0
+
+
+def test_price_out_of_range() -> None:
+    book = ArrayOrderBook()
+    for price in (0, MAX_PRICE + 1):
+        try:
+            book.add(Order(True, price + 1, price, 1))
+            assert False
+        except ValueError as e:
+            assert e.args[0] == f"Price is out of range: {price}"
@@ -0,0 +1,133 @@
+import os
+import pickle
+import random
+from io import StringIO
+
+import mock
+
+from orderbook import application
+from orderbook.book import OrderBook
+from orderbook.order import Order
+from orderbook.registry import BookRegistry
+
+from .test_ladder import random_order
+from .test_sharding import random_input
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_pickle_book() -> None:
+    book = OrderBook()
+    book.add(Order(False, 1, 10, 20, 5))
+    book.add(Order(False, 2, 10, 10))
+    book.add(Order(True, 3, 9, 10, 3))
+    book.add(Order(True, 4, 10, 7))
+    restored = pickle.loads(pickle.dumps(book))
+    assert str(restored) == str(book)
+    assert restored.timestamp == book.timestamp == 4
+    assert repr(restored.find(1)) == repr(book.find(1))
+    assert restored.find(1) is not book.find(1)
+
+    rnd = random.Random(0)
+    for order_id in range(5, 200):
+        order = random_order(rnd, order_id, book, range(5, 15))
+        assert str(restored.add(order)) == str(book.add(order))
+        assert str(restored) == str(book)
+
+
+def test_registry_matches_separate_books(tmp_path) -> None:
+    rnd = random.Random(1)
+    clock = Clock()
+    registry = BookRegistry(str(tmp_path), max_idle=5, memory_limit=4000, clock=clock)
+    books: dict = {}
+    for order_id in range(1, 2000):
+        symbol = f"S/{rnd.randrange(20)}"
+        book = books.setdefault(symbol, OrderBook())
+        order = random_order(rnd, order_id, book, range(95, 106))
+        clock.now += rnd.random()
+        assert str(registry.add(symbol, order)) == str(book.add(order))
+        assert registry.memory <= 4000 or registry.resident == [symbol]
+
+    assert len(registry) == len(books)
+    assert len(os.listdir(tmp_path)) == len(books) - len(registry.resident)
+    for symbol, book in books.items():
+        assert symbol in registry
+        assert str(registry.get(symbol)) == str(book)
+    assert os.listdir(tmp_path) == []
+    assert "X" not in registry
+
+
+def test_registry_eviction(caplog) -> None:
+    clock = Clock()
+    registry = BookRegistry(max_idle=10, clock=clock)
+    registry.add("A", Order(True, 1, 10, 5))
+    clock.now = 5
+    registry.add("B", Order(True, 1, 10, 5))
+    registry.add("B", Order(True, 2, 10, 5))
+    assert registry.resident == ["A", "B"]
+    assert registry.memory == 3 * BookRegistry.RECORD_SIZE + 2 * BookRegistry.BOOK_SIZE
+
+    clock.now = 12
+    registry.evict_idle()
+    assert registry.resident == ["B"]
+    assert registry.memory == 2 * BookRegistry.RECORD_SIZE + BookRegistry.BOOK_SIZE
+    clock.now = 100
+    registry.add("B", Order(False, 3, 10, 20))
+    assert registry.resident == ["B"] and len(registry) == 2
+
+    registry.evict("B")
+    assert registry.resident == [] and registry.memory == 0
+    assert registry.directory is not None and os.path.isdir(registry.directory)
+    assert registry.get("A").find(1) is not None
+    assert str(registry.get("B").find(3)) == (
+        "S,(p:10,t:3,n:0)->(visible:10,m:10,q:10)->(Id:3)"
+    )
+    assert [message for _, _, message in caplog.record_tuples] == []
+
+    registry.max_idle = None
+    registry.evict_idle()
+    assert registry.resident == ["A", "B"]
+
+    directory = registry.directory
+    registry.evict("A")
+    assert os.listdir(directory) == ["A.book"]
+    with registry:
+        pass
+    assert not os.path.exists(directory) and registry.directory is None
+    assert "A" not in registry and registry.resident == ["B"]
+
+
+def test_registry_close_keeps_directory(tmp_path) -> None:
+    with BookRegistry(str(tmp_path)) as registry:
+        registry.add("A", Order(True, 1, 10, 5))
+        registry.evict("A")
+        assert os.listdir(tmp_path) == ["A.book"]
+    assert os.listdir(tmp_path) == [] and registry.directory == str(tmp_path)
+
+
+def test_application_eviction(tmp_path) -> None:
+    input_data, expected = random_input(3, 500)
+    with mock.patch("sys.stdin", new=StringIO(input_data)):
+        with mock.patch("sys.stdout", new=StringIO()) as output_data:
+            application.start(
+                [
+                    "--symbols",
+                    "--workers",
+                    "2",
+                    "--evict-after",
+                    "0",
+                    "--memory-limit",
+                    "0.001",
+                    "--evict-dir",
+                    str(tmp_path),
+                ]
+            )
+            assert output_data.getvalue() == expected
+    # Workers remove the files of their evicted books on exit
+    assert os.listdir(tmp_path) == []
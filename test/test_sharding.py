@@ -0,0 +1,146 @@
+import logging
+import queue
+import random
+from io import BytesIO, StringIO
+
+import mock
+import pytest
+
+from orderbook import application
+from orderbook.book import OrderBook
+from orderbook.inputparser import BulkInputLexer
+from orderbook.sharding import ShardedMatcher, match_batches
+
+from .test_ladder import random_order
+
+SYMBOLS = ["AAPL", "MSFT", "BRK.B", "VOD.L", "X"]
+
+
+def random_input(seed: int, count: int):
+    """
+    :return: Input lines and the expected output of matching every symbol on
+        its own
+    """
+    rnd = random.Random(seed)
+    books = {symbol: OrderBook() for symbol in SYMBOLS}
+    lines, expected = [], []
+    for order_id in range(1, count):
+        symbol = rnd.choice(SYMBOLS)
+        order = random_order(rnd, order_id, books[symbol], range(95, 106))
+        fields = ["B" if order.is_buy else "S", order_id, order.price, order.quantity]
+        if order.peak_size is not None:
+            fields.append(order.peak_size)
+        lines.append(",".join(map(str, [symbol, *fields])) + "\n")
+        for transaction in books[symbol].add(order):
+            expected.append(f"{symbol},{transaction}\n")
+    return "".join(lines), "".join(expected)
+
+
+def test_match_batches(caplog) -> None:
+    inbox: queue.Queue = queue.Queue()
+    outbox: queue.Queue = queue.Queue()
+    inbox.put([(1, "A", "S,1,10,5"), (2, "B", "S,2,10,5"), (3, "A", "B,3,10")])
+    inbox.put([(4, "A", "B,4,10,2"), (5, "B", "B,5,11,7")])
+    inbox.put(None)
+    match_batches(inbox, outbox)
+    assert outbox.get() == []
+    assert outbox.get() == [(4, "A,4,1,10,2\n"), (5, "B,5,2,10,5\n")]
+    assert caplog.record_tuples[-1] == (
+        "root",
+        logging.ERROR,
+        "Line 3: Failed to parse order A,B,3,10",
+    )
+
+    logger, log_queue = logging.getLogger("worker"), queue.Queue()  # type: ignore
+    inbox.put([(1, "A", "B,1,10")])
+    inbox.put(None)
+    match_batches(
+        inbox, outbox, logger=logger, log_queue=log_queue, level=logging.ERROR
+    )
+    assert outbox.get() == []
+    assert [log_queue.get().getMessage() for _ in range(2)] == [
+        "Expected from 4 to 5 comma-separated values: 3",
+        "Line 1: Failed to parse order A,B,1,10",
+    ]
+    assert logger.level == logging.ERROR and not logger.propagate
+
+
+def test_sharded_matcher() -> None:
+    input_data, expected = random_input(1, 3000)
+    for workers, batch_size in [(1, 4096), (3, 100), (4, 1)]:
+        with ShardedMatcher(workers, batch_size) as matcher:
+            lexer = BulkInputLexer(BytesIO(input_data.encode()))
+            assert "".join(matcher.run(lexer)) == expected
+        assert matcher.worker_of("AAPL") == ShardedMatcher(workers).worker_of("AAPL")
+
+
+def test_sharded_matcher_errors(caplog) -> None:
+    caplog.set_level(logging.INFO)
+    input_data = (
+        "A,S,1,10,5\n\n  # comment\n  A,B,2,10,5\nA\nA B,S,2,10,5\n"
+        f"A,{'S' * 2000}\nA,B,4,10,6"
+    )
+    with ShardedMatcher(2) as matcher:
+        lexer = BulkInputLexer(BytesIO(input_data.encode()))
+        assert "".join(matcher.run(lexer)) == "A,4,1,10,5\n"
+    # Records of the router only, the worker matches orders at INFO level
+    records = [
+        record for record in caplog.records if record.processName == "MainProcess"
+    ]
+    assert [(r.name, r.levelno, r.getMessage()) for r in records] == [
+        ("root", logging.INFO, "Line 2: Whitespace string."),
+        ("root", logging.INFO, "Line 3: Comment string."),
+        (
+            "root",
+            logging.ERROR,
+            "Line 4: Starts with whitespaces but is not a comment or empty.",
+        ),
+        ("root", logging.ERROR, "Line 5: Failed to parse instrument of A"),
+        ("root", logging.ERROR, "Line 6: Failed to parse instrument of A B,S,2,10,5"),
+        ("root", logging.ERROR, "Input string is too long: 2003"),
+        ("root", logging.ERROR, f"Line 7: Failed to parse order A,{'S' * 1023}\n"),
+    ]
+
+
+def test_sharded_matcher_worker_logs(caplog) -> None:
+    with ShardedMatcher(2) as matcher:
+        lexer = BulkInputLexer(BytesIO(b"AAPL,X,2,10,20\nMSFT,S,1,10,5\n"))
+        assert "".join(matcher.run(lexer)) == ""
+    assert (
+        "root",
+        logging.ERROR,
+        "Unexpected buy direction: X",
+    ) in caplog.record_tuples
+    assert (
+        "root",
+        logging.ERROR,
+        "Line 1: Failed to parse order AAPL,X,2,10,20\n",
+    ) in caplog.record_tuples
+    assert {record.processName for record in caplog.records} != {"MainProcess"}
+
+
+def test_sharded_matcher_worker_exit() -> None:
+    with ShardedMatcher(2) as matcher:
+        matcher._ShardedMatcher__processes[1].terminate()  # type: ignore
+        lexer = BulkInputLexer(BytesIO(b"A,S,1,10,5\n"))
+        with pytest.raises(RuntimeError, match="Worker 1 exited with code -15"):
+            list(matcher.run(lexer))
+
+
+def test_application_symbols(tmp_path) -> None:
+    input_data, expected = random_input(2, 500)
+    with mock.patch("sys.stdin", new=StringIO(input_data)):
+        with mock.patch("sys.stdout", new=StringIO()) as output_data:
+            application.start(["--symbols", "--workers", "2"])
+            assert output_data.getvalue() == expected
+
+    path = tmp_path / "orders.txt"
+    path.write_text(input_data)
+    output = tmp_path / "trades.csv"
+    application.start(["--symbols", "--input", str(path), "--output", str(output)])
+    assert output.read_text() == expected
+
+    log = tmp_path / "orders.log"
+    with mock.patch("sys.stdin", new=StringIO("AAPL,X,2,10,20\n")):
+        application.start(["--symbols", "--workers", "2", "--log", str(log)])
+    assert "ERROR Line 1: Failed to parse order AAPL,X,2,10,20" in log.read_text()
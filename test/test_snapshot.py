@@ -0,0 +1,103 @@
+import os
+import pickle
+import random
+
+import pytest
+
+from orderbook import snapshot
+from orderbook.book import OrderBook
+from orderbook.columnar import ColumnarOrderBook
+from orderbook.ladder import LadderOrderBook
+from orderbook.order import Order
+from orderbook.pricearray import ArrayOrderBook
+
+from .test_ladder import random_order
+
+
+def random_book(seed: int, count: int) -> OrderBook:
+    rnd = random.Random(seed)
+    book = OrderBook()
+    for order_id in range(1, count):
+        book.add(random_order(rnd, order_id, book, range(95, 106)))
+    return book
+
+
+def test_snapshot_restore(tmp_path) -> None:
+    path = str(tmp_path / "book.snapshot")
+    for seed in range(5):
+        book = random_book(seed, 500)
+        book.snapshot(path)
+        restored = OrderBook.restore(path)
+        assert os.listdir(tmp_path) == ["book.snapshot"]
+        assert os.path.getsize(path) == snapshot.HEADER.size + snapshot.RECORD.size * (
+            len(book.buy) + len(book.sell)
+        )
+
+        assert restored.dumps() == book.dumps()
+        assert restored.timestamp == book.timestamp
+        assert repr(restored) == repr(book)
+        assert [r.sort_key for r in restored.buy] == [r.sort_key for r in book.buy]
+        for record in book.buy:
+            assert repr(restored.find(record.order_id)) == repr(record)
+
+        rnd = random.Random(seed)
+        for order_id in range(500, 1000):
+            order = random_order(rnd, order_id, book, range(95, 106))
+            assert str(restored.add(order)) == str(book.add(order))
+        assert str(restored) == str(book)
+
+
+@pytest.mark.parametrize(
+    "engine", [OrderBook, LadderOrderBook, ArrayOrderBook, ColumnarOrderBook]
+)
+def test_round_trip_engines(engine, tmp_path) -> None:
+    # Orders are generated against an OrderBook, see random_order
+    rnd = random.Random(1)
+    reference, book = OrderBook(), engine()
+    for order_id in range(1, 300):
+        order = random_order(rnd, order_id, reference, range(95, 106))
+        reference.add(order)
+        book.add(order)
+
+    path = str(tmp_path / "book.snapshot")
+    book.snapshot(path)
+    copies = [
+        pickle.loads(pickle.dumps(book)),
+        engine.loads(book.dumps()),
+        engine.restore(path),
+    ]
+    for restored in copies:
+        assert type(restored) is engine
+        assert restored.timestamp == book.timestamp
+        assert repr(restored) == repr(book) and str(restored) == str(book)
+        for record in book.sell:
+            assert repr(restored.find(record.order_id)) == repr(record)
+
+    for order_id in range(300, 600):
+        order = random_order(rnd, order_id, reference, range(95, 106))
+        expected = str(reference.add(order))
+        assert str(book.add(order)) == expected
+        for restored in copies:
+            assert str(restored.add(order)) == expected
+    for restored in copies:
+        assert str(restored) == str(book)
+
+
+def test_snapshot_empty_book() -> None:
+    book = OrderBook()
+    book.add(Order(True, 1, 10, 5))
+    book.add(Order(False, 2, 10, 5))
+    restored = OrderBook.loads(book.dumps())
+    assert restored.timestamp == 2 and not restored.buy and not restored.sell
+
+
+def test_snapshot_errors() -> None:
+    data = random_book(0, 10).dumps()
+    with pytest.raises(ValueError, match="Snapshot is truncated"):
+        OrderBook.loads(data[:10])
+    with pytest.raises(ValueError, match="Unknown snapshot format: b'OBSX' version 1"):
+        OrderBook.loads(b"OBSX" + data[4:])
+    with pytest.raises(ValueError, match="Unknown snapshot format: b'OBSN' version 2"):
+        OrderBook.loads(data[:4] + b"\x02" + data[5:])
+    with pytest.raises(ValueError, match="Snapshot size doesn't match"):
+        OrderBook.loads(data[:-1])